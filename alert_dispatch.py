@@ -0,0 +1,199 @@
+import asyncio
+import json
+import random
+import time
+import urllib.request
+import uuid
+from datetime import datetime
+
+from pipeline_metrics import EMERGENCY_METRICS
+
+
+class GatewayError(Exception):
+    """Raised by a gateway when a message could not be handed over (retryable)"""
+
+
+class TokenBucket:
+    """
+    Token bucket: at most `rate` sends per second, bursts up to `burst`
+    Callers reserve a token up front (tokens may go negative) and sleep until
+    their slot, so no lock is needed inside a single event loop.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """Take one token; returns how long to wait before using it"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class AlertGateway:
+    """
+    Base class for SMS/WhatsApp gateway adapters
+    Subclasses implement send() and return the provider's message id
+    """
+
+    channel = 'sms'
+
+    def __init__(self, name, rate_limit_per_sec=50, burst=None):
+        self.name = name
+        self.rate_limiter = TokenBucket(rate_limit_per_sec, burst) if rate_limit_per_sec else None
+
+    async def send(self, recipient, message):
+        raise NotImplementedError
+
+
+class WebhookGateway(AlertGateway):
+    """
+    Posts alerts as JSON to an HTTP gateway (SMS provider, WhatsApp Business API
+    relay, ...). The blocking urllib call runs in the default thread pool.
+    """
+
+    def __init__(self, name, url, channel='sms', headers=None, timeout=5,
+                 rate_limit_per_sec=50, burst=None):
+        super().__init__(name, rate_limit_per_sec, burst)
+        self.url = url
+        self.channel = channel
+        self.headers = headers or {}
+        self.timeout = timeout
+
+    def _post(self, payload):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json', **self.headers},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read().decode('utf-8') or '{}'
+        return json.loads(body).get('message_id', '')
+
+    async def send(self, recipient, message):
+        payload = {'to': recipient, 'channel': self.channel, 'message': message}
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, self._post, payload)
+        except Exception as e:
+            raise GatewayError(f"{self.name}: {e}") from e
+
+
+class StubGateway(AlertGateway):
+    """
+    Local gateway for testing and demos: waits `latency` seconds per message,
+    fails a `failure_rate` share of attempts and records what was sent
+    """
+
+    def __init__(self, name='stub-sms', channel='sms', latency=0.05, failure_rate=0.0,
+                 rate_limit_per_sec=None, burst=None, seed=None):
+        super().__init__(name, rate_limit_per_sec, burst)
+        self.channel = channel
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.random = random.Random(seed)
+        self.sent = []
+
+    async def send(self, recipient, message):
+        await asyncio.sleep(self.latency)
+        if self.random.random() < self.failure_rate:
+            raise GatewayError(f"{self.name}: simulated delivery failure")
+
+        message_id = uuid.uuid4().hex
+        self.sent.append({'recipient': recipient, 'message': message, 'message_id': message_id})
+        return message_id
+
+
+class AlertDispatcher:
+    """
+    Sends alert dicts concurrently through gateway adapters
+    - bounded concurrency (max_concurrency in-flight sends)
+    - per-gateway rate limits (token bucket on each gateway)
+    - retries with exponential backoff, then falls back to the next gateway
+    - returns one delivery receipt per alert
+    """
+
+    def __init__(self, gateways, max_concurrency=100, max_retries=3, backoff_base=0.2, metrics=None):
+        self.gateways = list(gateways)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        # Each dispatch() is timed as the pipeline's 'dispatch' stage
+        self.metrics = metrics or EMERGENCY_METRICS
+
+    def gateways_for(self, channel):
+        """Gateways to try for an alert: those on its channel first, then the rest"""
+        preferred = [g for g in self.gateways if g.channel == channel]
+        return preferred + [g for g in self.gateways if g.channel != channel]
+
+    async def _send_with_retries(self, gateway, recipient, message):
+        """Returns (message_id, attempts, error)"""
+        error = None
+        for attempt in range(1, self.max_retries + 1):
+            if gateway.rate_limiter is not None:
+                await gateway.rate_limiter.acquire()
+            try:
+                return await gateway.send(recipient, message), attempt, None
+            except GatewayError as e:
+                error = str(e)
+                if attempt < self.max_retries:
+                    delay = self.backoff_base * 2 ** (attempt - 1)
+                    await asyncio.sleep(delay + random.uniform(0, self.backoff_base))
+        return None, self.max_retries, error
+
+    async def _deliver(self, alert, semaphore):
+        async with semaphore:
+            started = time.perf_counter()
+            recipient = alert.get('recipient', alert['donor_id'])
+            total_attempts = 0
+            error = 'no gateway configured'
+
+            for gateway in self.gateways_for(alert.get('channel', 'sms')):
+                message_id, attempts, error = await self._send_with_retries(
+                    gateway, recipient, alert['message']
+                )
+                total_attempts += attempts
+                if message_id is not None:
+                    return {
+                        'donor_id': alert['donor_id'],
+                        'priority': alert.get('priority'),
+                        'status': 'delivered',
+                        'gateway': gateway.name,
+                        'channel': gateway.channel,
+                        'message_id': message_id,
+                        'attempts': total_attempts,
+                        'latency_ms': (time.perf_counter() - started) * 1000,
+                        'delivered_at': datetime.now().isoformat()
+                    }
+
+            return {
+                'donor_id': alert['donor_id'],
+                'priority': alert.get('priority'),
+                'status': 'failed',
+                'gateway': None,
+                'channel': alert.get('channel', 'sms'),
+                'message_id': None,
+                'attempts': total_attempts,
+                'latency_ms': (time.perf_counter() - started) * 1000,
+                'error': error
+            }
+
+    async def dispatch(self, alerts):
+        """Send all alerts concurrently; receipts come back in alert order"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        with self.metrics.time('dispatch'):
+            return await asyncio.gather(*(self._deliver(alert, semaphore) for alert in alerts))
+
+    def dispatch_sync(self, alerts):
+        """Blocking wrapper around dispatch() for synchronous callers"""
+        return asyncio.run(self.dispatch(alerts))
@@ -0,0 +1,465 @@
+# api_server.py
+# Standalone JSON API for the React frontend (stdlib asyncio, no web framework):
+#   GET  /forecast?blood_group=O+&days=14
+#   POST /emergency                {"blood_group": "O+", "location": "500001", "urgency": "high"}
+#   POST /sms                      {"from": "+91...", "text": "HELP O POS 560001"}
+#   GET  /gamification/user/<id>
+#   GET  /health
+#   GET  /metrics                  (Prometheus text format: emergency stage latencies)
+# Models and donor data are loaded once at startup (warm-up), so requests only
+# touch in-memory indexes. Run: python api_server.py [port]
+import ast
+import asyncio
+import json
+import os
+import sys
+import time
+from datetime import date, datetime
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from blood_compatibility import BLOOD_COMPATIBILITY, compatible_donor_groups, normalize_blood_group, to_short_blood_group
+from demand_forecasting import BloodDemandForecaster, load_demand_history
+from donor_ranking import EmergencyDonorRanking
+from donor_store import load_donors, load_gamification
+from emergency_matching import EmergencyBatcher
+from emergency_system import DEFAULT_PINCODE, EmergencySystem
+from gamification import DonorGamificationSystem
+from leaderboard import DonorLeaderboards
+from model_serving import DonorModelServer
+from pipeline_metrics import EMERGENCY_METRICS
+from response_cache import ResponseCache, forecast_key
+from sms_ingestion import SmsIngestor
+
+API_HOST = os.environ.get('BLOOD_BRIDGE_API_HOST', '0.0.0.0')
+API_PORT = int(os.environ.get('BLOOD_BRIDGE_API_PORT', '8000'))
+# > 0: emergencies arriving within this many seconds share one donor assignment
+EMERGENCY_BATCH_SECONDS = float(os.environ.get('BLOOD_BRIDGE_EMERGENCY_BATCH_SECONDS', '0'))
+
+MAX_FORECAST_DAYS = 30
+DEFAULT_FORECAST_DAYS = 14
+MAX_BODY_BYTES = 64 * 1024
+KEEP_ALIVE_TIMEOUT = 15
+
+# Risk level = predicted demand relative to the group's mean training demand
+RISK_HIGH_RATIO = 1.2
+RISK_MEDIUM_RATIO = 0.8
+
+DONATION_MILESTONES = [(1, 'First Drop'), (5, 'Regular Hero'), (10, 'Blood Champion'), (20, 'Life Saver Legend')]
+
+
+class ApiError(Exception):
+    """Request error returned to the client as {"error": message} with an HTTP status"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class BloodBridgeService:
+    """
+    Forecast, emergency and gamification engines behind the API
+    warm_up() loads everything up front; the payload methods are plain
+    functions of the loaded state, shared with the Streamlit backend page.
+    """
+
+    def __init__(self, dispatcher=None, cache=None, batch_seconds=EMERGENCY_BATCH_SECONDS):
+        self.dispatcher = dispatcher
+        self.cache = cache or ResponseCache()
+        self.batch_seconds = batch_seconds
+        self.gamification = DonorGamificationSystem()
+        self.model_server = None
+        self.ranking_system = None
+        self.emergency_system = None
+        self.emergency_batcher = None
+        self.sms_ingestor = None
+        self.forecaster = None
+        self.forecasts = None
+        self.forecast_day = None
+        self.gamification_table = None
+        self.leaderboards = None
+        self.warm_up_seconds = None
+
+    def warm_up(self):
+        """Load donors, models and leaderboards, train the forecaster and run one request of each kind"""
+        started = time.perf_counter()
+
+        self.model_server = DonorModelServer.load()
+        self.ranking_system = EmergencyDonorRanking.from_store(self.model_server, self.gamification)
+        self.emergency_system = EmergencySystem(self.ranking_system, self.dispatcher)
+        if self.batch_seconds:
+            self.emergency_batcher = EmergencyBatcher(self.emergency_system, self.batch_seconds)
+        self.sms_ingestor = SmsIngestor(self.emergency_system, self.emergency_batcher)
+
+        self.forecaster = BloodDemandForecaster()
+        self.forecaster.train_forecasting_models(load_demand_history())
+        self.refresh_forecasts()
+
+        df_gamification = load_gamification()
+        df_locations = load_donors(columns=['user_id', 'latitude', 'longitude'])
+        self.leaderboards = DonorLeaderboards.from_dataframe(df_gamification, df_locations)
+        self.gamification_table = df_gamification.drop_duplicates('user_id').set_index('user_id')
+
+        # First calls pay for lazy imports and caches; do them before serving
+        self.emergency_system.prepare_emergency_alerts(f"HELP O+ {DEFAULT_PINCODE}")
+        self.gamification_payload(None)
+        # Latency percentiles should describe served requests, not the cold start
+        EMERGENCY_METRICS.reset()
+
+        self.warm_up_seconds = time.perf_counter() - started
+        return self
+
+    def retrain_forecaster(self, df_history=None):
+        """Retrain the demand models and drop cached forecast responses"""
+        self.forecaster.train_forecasting_models(load_demand_history() if df_history is None else df_history)
+        self.refresh_forecasts()
+
+    def refresh_forecasts(self):
+        """Forecast all blood groups for MAX_FORECAST_DAYS (once per calendar day)"""
+        self.cache.invalidate(lambda key: key[0] == 'forecast')
+        self.forecasts = {
+            blood_group: frame.reset_index(drop=True)
+            for blood_group, frame in self.forecaster.forecast_demand(MAX_FORECAST_DAYS).groupby('blood_group')
+        }
+        self.forecast_day = date.today()
+
+    def forecast_payload(self, blood_group, days=DEFAULT_FORECAST_DAYS):
+        """Forecast for one blood group (same response schema as the old simulated API)"""
+        short_group = to_short_blood_group(blood_group)
+        if short_group not in self.forecaster.models:
+            raise ApiError(400, f"Unknown blood group: {blood_group}")
+        if not 1 <= days <= MAX_FORECAST_DAYS:
+            raise ApiError(400, f"days must be between 1 and {MAX_FORECAST_DAYS}")
+        if self.forecast_day != date.today():
+            self.refresh_forecasts()
+
+        key = forecast_key(short_group, days, self.forecaster.model_version, self.forecast_day)
+        return self.cache.get_or_compute(key, lambda: self._forecast_payload(short_group, days))
+
+    async def forecast_payload_async(self, blood_group, days=DEFAULT_FORECAST_DAYS):
+        """forecast_payload in a worker thread: a cache miss (or the daily refresh) does not stall the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.forecast_payload, blood_group, days)
+
+    def _forecast_payload(self, short_group, days):
+        forecast = self.forecasts[short_group].head(days)
+        mean_demand = self.forecaster.models[short_group]['mean_demand']
+        demands = forecast['predicted_demand'].to_numpy()
+        risk_levels = np.select(
+            [demands > mean_demand * RISK_HIGH_RATIO, demands > mean_demand * RISK_MEDIUM_RATIO],
+            ['High', 'Medium'], default='Low'
+        )
+        lower = forecast['confidence_lower'].to_numpy(dtype=float).tolist()
+        upper = forecast['confidence_upper'].to_numpy(dtype=float).tolist()
+        dates = [d.strftime('%Y-%m-%d') for d in forecast['date']]
+
+        return {
+            'blood_group': short_group,
+            'forecast_period': days,
+            'data': [
+                {
+                    'date': dates[i],
+                    'predicted_demand': int(demands[i]),
+                    'risk_level': str(risk_levels[i]),
+                    'confidence_lower': lower[i],
+                    'confidence_upper': upper[i]
+                }
+                for i in range(len(forecast))
+            ],
+            'summary': {
+                'avg_daily_demand': int(demands.mean()),
+                'total_monthly_demand': int(demands.sum()),
+                'high_risk_days': int((risk_levels == 'High').sum()),
+                'peak_demand_date': dates[int(np.argmax(demands))],
+                'peak_demand_value': int(demands.max())
+            }
+        }
+
+    def _emergency_message(self, blood_group, location):
+        name = normalize_blood_group(blood_group)
+        if name not in BLOOD_COMPATIBILITY:
+            raise ApiError(400, f"Unknown blood group: {blood_group}")
+        pincode = str(location or DEFAULT_PINCODE).strip()
+        return f"HELP {to_short_blood_group(name)} {pincode}", pincode
+
+    def _emergency_response(self, blood_group, pincode, result):
+        if result is None or result['status'] != 'success':
+            raise ApiError(500, (result or {}).get('message', 'Emergency request could not be processed'))
+        response = {
+            'blood_group_requested': to_short_blood_group(blood_group),
+            'location': pincode,
+            'compatible_blood_groups': [to_short_blood_group(g) for g in compatible_donor_groups(blood_group)],
+            'compatible_donors': result['compatible_donors'],
+            'search_radius_km': result['search_radius_km'],
+            'location_precision': result.get('location_precision'),
+            'donors_contacted': result['alerts_sent'],
+            'alerts': result['top_donors']
+        }
+        if 'batch_size' in result:
+            response['batch_size'] = result['batch_size']
+        if 'delivery_receipts' in result:
+            response['alerts_failed'] = result['alerts_failed']
+            response['delivery_receipts'] = result['delivery_receipts']
+        return response
+
+    def emergency_payload(self, blood_group, location=None):
+        """Rank donors near a pincode and build (and, with a dispatcher, send) alerts"""
+        message, pincode = self._emergency_message(blood_group, location)
+        result = self.emergency_system.process_emergency_request(message)
+        return self._emergency_response(blood_group, pincode, result)
+
+    async def emergency_payload_async(self, blood_group, location=None, urgency='high'):
+        """
+        emergency_payload for the event loop: ranking runs in a worker thread;
+        with batching on, donors are assigned across the requests of a batch window
+        """
+        message, pincode = self._emergency_message(blood_group, location)
+        if self.emergency_batcher is not None:
+            result = await self.emergency_batcher.submit(message, urgency)
+        else:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(None, self.emergency_system.prepare_emergency_alerts, message)
+        if self.dispatcher is not None and result and result['status'] == 'success':
+            receipts = await self.dispatcher.dispatch(result['top_donors'])
+            result = self.emergency_system.attach_receipts(result, receipts)
+        return self._emergency_response(blood_group, pincode, result)
+
+    async def sms_payload_async(self, sender, text):
+        """Inbound SMS webhook: deduplicated, queued and ranked by the SMS worker pool"""
+        return await self.sms_ingestor.ingest(sender, text)
+
+    def gamification_payload(self, donor_id=None):
+        """Score, badges, milestones and leaderboard positions of one donor"""
+        if donor_id is None:
+            donor_id = self.leaderboards.top(1)[0][0]  # Demo: current #1 donor
+        if donor_id not in self.gamification_table.index:
+            raise ApiError(404, f"Unknown donor: {donor_id}")
+
+        donor = self.gamification_table.loc[donor_id]
+        badges = donor['badges']
+        earned = set(ast.literal_eval(badges)) if isinstance(badges, str) else set(badges)
+        if self.leaderboards.is_local_hero(donor_id):
+            earned.add('local_hero')
+
+        donations = int(donor['donations']) if pd.notna(donor['donations']) else 0
+        next_milestone = next(((count, name) for count, name in DONATION_MILESTONES if donations < count), None)
+        positions = self.leaderboards.positions(donor_id)
+
+        return {
+            'donor_id': donor_id,
+            'total_points': float(donor['score']),
+            'total_donations': donations,
+            'badges': [
+                {'name': badge['name'], 'description': badge['description'], 'points': badge['points'],
+                 'earned': key in earned}
+                for key, badge in self.gamification.badges.items()
+            ],
+            'leaderboard_position': positions['overall'],
+            'leaderboard': positions,
+            'next_milestone': f"{next_milestone[1]} ({next_milestone[0]} donations)" if next_milestone else None,
+            'donations_to_next_milestone': next_milestone[0] - donations if next_milestone else 0
+        }
+
+    async def gamification_payload_async(self, donor_id=None):
+        """gamification_payload in a worker thread, off the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.gamification_payload, donor_id)
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _parse_query(query):
+    """Query string -> dict; '+' is kept literally so ?blood_group=O+ works unencoded"""
+    params = {}
+    for pair in query.split('&'):
+        if pair:
+            key, _, value = pair.partition('=')
+            params[unquote(key)] = unquote(value)
+    return params
+
+
+class ApiServer:
+    """
+    Minimal HTTP/1.1 JSON server on asyncio streams with keep-alive and CORS
+    Routes requests to a warmed-up BloodBridgeService.
+    """
+
+    def __init__(self, service, host=API_HOST, port=API_PORT):
+        self.service = service
+        self.host = host
+        self.port = port
+        self.requests_served = 0
+        self.server = None
+
+    async def route(self, method, path, query, body):
+        """Returns (status, payload)"""
+        if path == '/health':
+            return 200, {'status': 'ok', 'warm_up_seconds': self.service.warm_up_seconds,
+                         'requests_served': self.requests_served,
+                         'model_version': self.service.forecaster.model_version,
+                         'cache': self.service.cache.stats(),
+                         'model_latency': self.service.model_server.latency_stats(),
+                         'propensity_precomputed': self.service.ranking_system.propensity is not None,
+                         'sms': dict(self.service.sms_ingestor.stats,
+                                     queue_depth=self.service.sms_ingestor.queue_depth()),
+                         'emergency_latency': EMERGENCY_METRICS.summary()}
+
+        if path == '/metrics':
+            return 200, EMERGENCY_METRICS.to_prometheus()
+
+        if path == '/forecast':
+            if method != 'GET':
+                raise ApiError(405, "Use GET")
+            params = _parse_query(query)
+            try:
+                days = int(params.get('days', DEFAULT_FORECAST_DAYS))
+            except ValueError:
+                raise ApiError(400, "days must be an integer")
+            return 200, await self.service.forecast_payload_async(params.get('blood_group', 'O+'), days)
+
+        if path == '/emergency':
+            if method != 'POST':
+                raise ApiError(405, "Use POST")
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError:
+                raise ApiError(400, "Body must be JSON")
+            if not isinstance(request, dict) or 'blood_group' not in request:
+                raise ApiError(400, "blood_group is required")
+            return 200, await self.service.emergency_payload_async(
+                request['blood_group'], request.get('location', request.get('pincode')),
+                request.get('urgency', 'high')
+            )
+
+        if path == '/sms':
+            if method != 'POST':
+                raise ApiError(405, "Use POST")
+            try:
+                request = json.loads(body or b'{}')
+            except ValueError:
+                raise ApiError(400, "Body must be JSON")
+            if not isinstance(request, dict) or 'text' not in request:
+                raise ApiError(400, "text is required")
+            return 200, await self.service.sms_payload_async(request.get('from', ''), request['text'])
+
+        if path == '/gamification/user' or path.startswith('/gamification/user/'):
+            if method != 'GET':
+                raise ApiError(405, "Use GET")
+            # No id (with or without the trailing slash) -> the demo donor
+            donor_id = unquote(path[len('/gamification/user'):].lstrip('/'))
+            return 200, await self.service.gamification_payload_async(donor_id or None)
+
+        raise ApiError(404, f"No route for {path}")
+
+    def _response(self, status, payload, keep_alive):
+        reason = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+                  405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+        content_type = 'application/json'
+        if isinstance(payload, str):  # /metrics
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = b'' if payload is None else json.dumps(payload, default=_json_default).encode('utf-8')
+        headers = [
+            f"HTTP/1.1 {status} {reason.get(status, 'OK')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            "Access-Control-Allow-Origin: *",
+            "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+            "Access-Control-Allow-Headers: Content-Type",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    writer.write(self._response(400, {'error': 'Malformed request line'}, False))
+                    break
+                method, target, version = parts
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    length = int(headers.get('content-length', 0) or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    writer.write(self._response(400, {'error': 'Invalid Content-Length'}, False))
+                    break
+                if length > MAX_BODY_BYTES:
+                    writer.write(self._response(413, {'error': 'Request body too large'}, False))
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                url = urlsplit(target)
+                if method == 'OPTIONS':  # CORS preflight
+                    status, payload = 204, None
+                else:
+                    try:
+                        status, payload = await self.route(method, url.path.rstrip('/') or '/', url.query, body)
+                    except ApiError as e:
+                        status, payload = e.status, {'error': e.message}
+                    except Exception as e:
+                        status, payload = 500, {'error': str(e)}
+
+                self.requests_served += 1
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                 reuse_address=True, backlog=1024)
+        return self.server
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+
+def main(port=API_PORT):
+    print("🔄 Warming up models and donor data...")
+    service = BloodBridgeService().warm_up()
+    print(f"✅ Ready in {service.warm_up_seconds:.1f}s")
+    print(f"🚀 Serving Blood Bridge API on http://{API_HOST}:{port}")
+    try:
+        asyncio.run(ApiServer(service, port=port).serve_forever())
+    except KeyboardInterrupt:
+        print("👋 API server stopped")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else API_PORT)
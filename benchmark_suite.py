@@ -0,0 +1,302 @@
+# benchmark_suite.py
+# Microbenchmarks for the hot paths, at 7k (the real donor data), 100k and 1M
+# donors:
+#   python benchmark_suite.py                       # run and compare with the baselines
+#   python benchmark_suite.py --scales 7k 100k --save
+# Larger scales generate donors with synthetic_data.py into a temporary donor
+# store (the gamification table is resampled from the real one). Results are compared with
+# benchmark_baselines.json; a median time slower than the baseline's by more
+# than --tolerance (widened by the measured run-to-run spread) is reported as a
+# regression (exit status 1).
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from blood_compatibility import BLOOD_GROUPS
+from demand_forecasting import BloodDemandForecaster, load_demand_history
+from donor_ranking import EmergencyDonorRanking
+from donor_store import DATA_DIR, STORE_DIR, load_gamification, write_table
+from donor_table import DonorTable
+from emergency_matching import MAX_BATCH_CANDIDATES, assign_donors
+from emergency_system import MAX_ALERTS, EmergencySystem
+from gamification import DonorGamificationSystem
+from model_serving import DonorModelServer
+from synthetic_data import generate_donor_store
+
+BASELINES_PATH = os.path.join(DATA_DIR, 'benchmark_baselines.json')
+
+# Scale label -> donor count (None = the real donor table)
+SCALES = {'7k': None, '100k': 100_000, '1M': 1_000_000}
+DEFAULT_REPEAT = 5
+# Untimed runs before measuring (caches, lazily built indexes, CPU frequency)
+DEFAULT_WARMUP = 2
+# Slowdown of the median time against the baseline reported as a regression...
+DEFAULT_TOLERANCE = 0.25
+# ...plus this many times the larger relative spread (IQR / median) of the two runs,
+# so a noisy case needs a proportionally larger slowdown to be flagged
+NOISE_SPREADS = 2.0
+# Jitter (degrees) applied to resampled donor coordinates
+SCALE_JITTER_DEG = 0.05
+SCALE_SEED = 42
+
+EMERGENCY_MESSAGE = "HELP O+ 500001"
+EMERGENCY_LOCATION = (17.3850, 78.4867)  # Hyderabad
+FORECAST_DAYS = 30
+# Original row-wise implementations timed as reference cases (reference -> optimized
+# benchmark), up to REFERENCE_MAX_ROWS donors: they are O(n) Python loops
+REFERENCE_CASES = {
+    'rank_O+_rowwise': 'rank_O+',
+    'gamification_scores_rowwise': 'gamification_scores',
+    'forecast_demand_per_row': 'forecast_demand'
+}
+REFERENCE_MAX_ROWS = 100_000
+REFERENCE_REPEAT = 3
+# Batch assignment: open requests, each with its ranked candidates, over a donor universe
+BATCH_REQUESTS = 300
+BATCH_UNIVERSE = 100_000
+
+
+def scale_table(df, n_rows, seed=SCALE_SEED):
+    """Resample a table to n_rows with new ids and jittered coordinates"""
+    rng = np.random.default_rng(seed)
+    scaled = df.iloc[rng.integers(0, len(df), n_rows)].reset_index(drop=True)
+    if 'user_id' in scaled.columns:
+        ids = np.frombuffer(rng.bytes(32 * n_rows), dtype='S32')
+        scaled['user_id'] = ['\\x' + i.hex() for i in ids]
+    for col in ('latitude', 'longitude'):
+        if col in scaled.columns:
+            values = pd.to_numeric(scaled[col], errors='coerce').to_numpy(dtype=float)
+            scaled[col] = values + rng.normal(0, SCALE_JITTER_DEG, n_rows)
+    return scaled
+
+
+def build_store(n_rows, store_dir):
+    """Donor store with n_rows synthetic donors (gamification table resampled alongside)"""
+    generate_donor_store(n_rows, store_dir, seed=SCALE_SEED)
+    write_table(scale_table(load_gamification(mmap=False), n_rows), os.path.join(store_dir, 'gamification'))
+
+
+def measure(fn, repeat, warmup=DEFAULT_WARMUP):
+    """Run fn warmup times untimed, then repeat times; timings in milliseconds"""
+    for _ in range(warmup):
+        fn()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings = np.array(timings)
+    median = float(np.median(timings))
+    q25, q75 = np.percentile(timings, [25, 75])
+    return {
+        'median_ms': median,
+        'min_ms': float(timings.min()),
+        'p95_ms': float(np.percentile(timings, 95)),
+        'spread': float((q75 - q25) / median) if median > 0 else 0.0,
+        'repeat': repeat
+    }
+
+
+def load_data(store_dir):
+    """What the dashboard's load_data does with the donor store"""
+    return DonorTable.from_store(store_dir).to_dataframe(), load_gamification(store_dir=store_dir)
+
+
+def donor_benchmarks(store_dir, model_server):
+    """name -> zero-argument callable, for the donors in store_dir"""
+    gamification = DonorGamificationSystem()
+    donor_table = DonorTable.from_store(store_dir)
+    ranking = EmergencyDonorRanking(model_server, donor_table, gamification)
+    emergency = EmergencySystem(ranking)
+    donors = ranking.df_donors
+
+    benchmarks = {
+        'load_data': lambda: load_data(store_dir),
+        'emergency_request': lambda: emergency.process_emergency_request(EMERGENCY_MESSAGE),
+        'gamification_scores': lambda: gamification.score_table(donors)
+    }
+    for blood_group in BLOOD_GROUPS:
+        request = {'blood_group': blood_group, 'latitude': EMERGENCY_LOCATION[0],
+                   'longitude': EMERGENCY_LOCATION[1], 'urgency': 'high'}
+        benchmarks[f'rank_{blood_group}'] = (
+            lambda request=request: ranking.rank_donors_vectorized(request)
+        )
+
+    if len(donors) <= REFERENCE_MAX_ROWS:
+        request = {'blood_group': 'O+', 'latitude': EMERGENCY_LOCATION[0],
+                   'longitude': EMERGENCY_LOCATION[1], 'urgency': 'high'}
+        benchmarks['rank_O+_rowwise'] = lambda: ranking.rank_donors_for_emergency(request, vectorized=False)
+        benchmarks['gamification_scores_rowwise'] = lambda: [
+            gamification.calculate_donor_score(donor) for _, donor in donors.iterrows()
+        ]
+    return benchmarks
+
+
+def quiet(fn):
+    """fn with its progress prints silenced"""
+    def run():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fn()
+    return run
+
+
+def forecast_benchmarks():
+    """Forecasting does not depend on the donor count; run once per suite"""
+    history = load_demand_history()
+    forecaster = BloodDemandForecaster()
+    quiet(lambda: forecaster.train_forecasting_models(history))()
+    return {
+        'forecast_train': quiet(lambda: BloodDemandForecaster().train_forecasting_models(history)),
+        'forecast_demand': lambda: forecaster.forecast_demand(FORECAST_DAYS),
+        'forecast_demand_per_row': lambda: forecaster.forecast_demand(FORECAST_DAYS, mode='per_row')
+    }
+
+
+def matching_benchmarks():
+    """Batch donor assignment for BATCH_REQUESTS open requests (independent of the donor store)"""
+    rng = np.random.default_rng(SCALE_SEED)
+    candidate_ids = [rng.choice(BATCH_UNIVERSE, MAX_BATCH_CANDIDATES, replace=False).astype(str)
+                     for _ in range(BATCH_REQUESTS)]
+    candidate_weights = [np.sort(rng.random(MAX_BATCH_CANDIDATES))[::-1] for _ in range(BATCH_REQUESTS)]
+    return {
+        'batch_assignment': lambda: assign_donors(candidate_ids, candidate_weights, MAX_ALERTS)
+    }
+
+
+def _repeat_for(name, repeat):
+    """Reference cases are slow and only there for comparison: fewer repeats"""
+    return min(repeat, REFERENCE_REPEAT) if name in REFERENCE_CASES else repeat
+
+
+def run_suite(scales, repeat=DEFAULT_REPEAT, log=print):
+    """{scale label: {benchmark: timings}}; forecasting and batch assignment are reported under 'global'"""
+    model_server = DonorModelServer.load()
+    results = {'global': {}}
+    for name, fn in {**forecast_benchmarks(), **matching_benchmarks()}.items():
+        results['global'][name] = measure(fn, _repeat_for(name, repeat))
+        log(f"  global {name}: {results['global'][name]['median_ms']:.2f} ms")
+
+    for label in scales:
+        n_rows = SCALES[label]
+        tmp_dir = None
+        store_dir = STORE_DIR
+        if n_rows is not None:
+            tmp_dir = tempfile.mkdtemp(prefix=f'bench_{label}_')
+            store_dir = tmp_dir
+            log(f"🔄 Building {label} donor store...")
+            build_store(n_rows, store_dir)
+        try:
+            results[label] = {}
+            for name, fn in donor_benchmarks(store_dir, model_server).items():
+                results[label][name] = measure(fn, _repeat_for(name, repeat))
+                log(f"  {label} {name}: {results[label][name]['median_ms']:.2f} ms")
+        finally:
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+    return results
+
+
+def speedups(results):
+    """[(scale, optimized benchmark, reference ms, optimized ms)] for every reference case that ran"""
+    rows = []
+    for label, benchmarks in results.items():
+        for reference, optimized in REFERENCE_CASES.items():
+            if reference in benchmarks and optimized in benchmarks:
+                rows.append((label, optimized, benchmarks[reference]['median_ms'], benchmarks[optimized]['median_ms']))
+    return rows
+
+
+def machine_info():
+    return {
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'cpu_count': os.cpu_count()
+    }
+
+
+def load_baselines(path=BASELINES_PATH):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_baselines(results, path=BASELINES_PATH):
+    """Merge results into the baseline file (other scales are kept)"""
+    baselines = load_baselines(path) or {'results': {}}
+    for label, benchmarks in results.items():
+        baselines['results'].setdefault(label, {}).update(benchmarks)
+    baselines['machine'] = machine_info()
+    baselines['recorded_at'] = datetime.now().isoformat(timespec='seconds')
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+    return baselines
+
+
+def allowed_slowdown(baseline, timing, tolerance=DEFAULT_TOLERANCE):
+    """Relative slowdown of the median tolerated for one benchmark: tolerance plus NOISE_SPREADS spreads"""
+    return tolerance + NOISE_SPREADS * max(baseline.get('spread', 0.0), timing.get('spread', 0.0))
+
+
+def find_regressions(results, baselines, tolerance=DEFAULT_TOLERANCE):
+    """[(scale, benchmark, baseline ms, current ms)] for medians over baseline * (1 + allowed_slowdown)"""
+    regressions = []
+    for label, benchmarks in results.items():
+        for name, timing in benchmarks.items():
+            baseline = baselines['results'].get(label, {}).get(name)
+            if baseline and timing['median_ms'] > baseline['median_ms'] * (1 + allowed_slowdown(baseline, timing, tolerance)):
+                regressions.append((label, name, baseline['median_ms'], timing['median_ms']))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Blood Bridge microbenchmarks")
+    parser.add_argument('--scales', nargs='+', choices=list(SCALES), default=list(SCALES))
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument('--baselines', default=BASELINES_PATH)
+    parser.add_argument('--save', action='store_true', help="record the results as the new baselines")
+    args = parser.parse_args(argv)
+
+    print("⏱️ Running benchmarks...")
+    results = run_suite(args.scales, args.repeat)
+
+    for label, name, reference, optimized in speedups(results):
+        print(f"⚡ {label} {name}: {reference:.2f} ms row-wise -> {optimized:.2f} ms "
+              f"({reference / max(optimized, 1e-9):.0f}x)")
+
+    baselines = load_baselines(args.baselines)
+    if args.save:
+        save_baselines(results, args.baselines)
+        print(f"📁 Baselines written to {args.baselines}")
+        return 0
+    if baselines is None:
+        print("ℹ️ No baselines yet (run with --save)")
+        return 0
+    if baselines.get('machine', {}).get('platform') != machine_info()['platform']:
+        print("⚠️ Baselines were recorded on a different machine; comparisons are indicative only")
+
+    regressions = find_regressions(results, baselines, args.tolerance)
+    for label, name, before, after in regressions:
+        print(f"❌ {label} {name}: {before:.2f} ms -> {after:.2f} ms (+{(after / before - 1) * 100:.0f}%)")
+    if not regressions:
+        print(f"✅ No regressions over {args.tolerance:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+BLOOD_GROUPS = ['O+', 'O-', 'A+', 'A-', 'B+', 'B-', 'AB+', 'AB-']
+
+# Blood group compatibility rules (recipient -> compatible donor groups)
+BLOOD_COMPATIBILITY = {
+    'O Negative': ['O Negative'],
+    'O Positive': ['O Negative', 'O Positive'],
+    'A Negative': ['O Negative', 'A Negative'],
+    'A Positive': ['O Negative', 'O Positive', 'A Negative', 'A Positive'],
+    'B Negative': ['O Negative', 'B Negative'],
+    'B Positive': ['O Negative', 'O Positive', 'B Negative', 'B Positive'],
+    'AB Negative': ['O Negative', 'A Negative', 'B Negative', 'AB Negative'],
+    'AB Positive': ['O Negative', 'O Positive', 'A Negative', 'A Positive',
+                  'B Negative', 'B Positive', 'AB Negative', 'AB Positive']
+}
+
+# Accepts 'O+', 'O -', 'O Positive', 'o pos', 'O+VE', 'O -ve', 'AB NEGATIVE', ...
+_BLOOD_GROUP_PATTERN = re.compile(
+    r'^(AB|A|B|O)\s*(\+\s*VE|-\s*VE|\+|-|POSITIVE|POS|NEGATIVE|NEG)$'
+)
+
+
+def normalize_blood_group(blood_group):
+    """
+    Map any common spelling to the donor table naming ('O+' -> 'O Positive')
+    Unrecognised values (e.g. 'A1 Positive') are returned stripped but unchanged
+    """
+    if blood_group is None or (isinstance(blood_group, float) and np.isnan(blood_group)):
+        return None
+
+    text = str(blood_group).strip()
+    match = _BLOOD_GROUP_PATTERN.match(re.sub(r'\s+', ' ', text.upper()))
+    if not match:
+        return text
+
+    abo, rh = match.groups()
+    sign = 'Negative' if rh.startswith(('-', 'NEG')) else 'Positive'
+    return f'{abo} {sign}'
+
+
+def to_short_blood_group(blood_group):
+    """'O Positive' (or any accepted spelling) -> 'O+'"""
+    name = normalize_blood_group(blood_group)
+    if name in BLOOD_COMPATIBILITY:
+        abo, sign = name.split()
+        return abo + ('+' if sign == 'Positive' else '-')
+    return name
+
+
+def compatible_donor_groups(recipient_group):
+    """Donor groups that can give to a recipient (unknown groups match only themselves)"""
+    name = normalize_blood_group(recipient_group)
+    return BLOOD_COMPATIBILITY.get(name, [name])
+
+
+class CompatibilityIndex:
+    """
+    Donor rows partitioned once by blood group
+    Each partition is a contiguous slice of self.order (row positions in table
+    order), so a recipient's donor set is a concatenation of a few slices
+    instead of an isin() scan over the whole table.
+    """
+
+    def __init__(self, blood_groups):
+        raw_codes, raw_names = pd.factorize(pd.Series(blood_groups), use_na_sentinel=True)
+
+        # Normalise only the distinct spellings, then merge duplicates
+        self.group_names = []
+        remap = np.empty(len(raw_names), dtype=np.int16)
+        for i, raw_name in enumerate(raw_names):
+            name = normalize_blood_group(raw_name)
+            if name not in self.group_names:
+                self.group_names.append(name)
+            remap[i] = self.group_names.index(name)
+
+        if len(remap):
+            self.codes = np.where(raw_codes >= 0, remap[raw_codes], -1).astype(np.int16)
+        else:
+            self.codes = np.full(len(raw_codes), -1, dtype=np.int16)
+        self.group_codes = {name: code for code, name in enumerate(self.group_names)}
+
+        # Stable sort keeps table order inside every partition
+        self.order = np.argsort(self.codes, kind='stable')
+        counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.group_names))
+        start = int((self.codes < 0).sum())  # rows without a blood group sort first
+        self.partitions = {}
+        for name, count in zip(self.group_names, counts):
+            self.partitions[name] = (start, start + int(count))
+            start += int(count)
+
+    @classmethod
+    def from_dataframe(cls, df, column='blood_group'):
+        """Build the index over a donor DataFrame (positions are row positions)"""
+        return cls(df[column])
+
+    def partition(self, donor_group):
+        """Row positions of donors of exactly one blood group"""
+        start, stop = self.partitions.get(normalize_blood_group(donor_group), (0, 0))
+        return self.order[start:stop]
+
+    def positions(self, recipient_group):
+        """Row positions (table order) of donors compatible with a recipient"""
+        parts = [self.partition(group) for group in compatible_donor_groups(recipient_group)]
+        if not parts:
+            return np.empty(0, dtype=self.order.dtype)
+        return np.sort(np.concatenate(parts))
+
+    def count(self, recipient_group):
+        """Number of compatible donors, straight from the partition sizes"""
+        total = 0
+        for group in compatible_donor_groups(recipient_group):
+            start, stop = self.partitions.get(group, (0, 0))
+            total += stop - start
+        return total
+
+    def is_compatible(self, positions, recipient_group):
+        """Boolean mask over the given row positions: can each donor give to the recipient?"""
+        lookup = np.zeros(len(self.group_names) + 1, dtype=bool)  # last slot = missing group
+        for group in compatible_donor_groups(recipient_group):
+            if group in self.group_codes:
+                lookup[self.group_codes[group]] = True
+        return lookup[self.codes[positions]]
+
+    def select(self, df, recipient_group):
+        """Rows of df (the indexed table) compatible with a recipient"""
+        return df.iloc[self.positions(recipient_group)]
+
+
+def compatibility_matrix(blood_groups=BLOOD_GROUPS):
+    """
+    Recipient x donor 0/1 matrix over blood_groups (either spelling):
+    matrix[r, d] = 1 when group d can give to group r, so matrix @ donor
+    counts per group = compatible donors per recipient group
+    """
+    names = [normalize_blood_group(group) for group in blood_groups]
+    matrix = np.zeros((len(names), len(names)), dtype=np.int64)
+    for r, recipient in enumerate(names):
+        for d, donor in enumerate(names):
+            matrix[r, d] = donor in compatible_donor_groups(recipient)
+    return matrix
@@ -3,9 +3,29 @@ import streamlit as st
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
+from datetime import date
 import json
+import os
+
+from blood_compatibility import CompatibilityIndex, to_short_blood_group
+from demand_forecasting import BloodDemandForecaster, load_demand_history
+from donor_map import DEFAULT_ZOOM, GRID_LEVELS
+from donor_query import DonorQueryIndex
+from donor_ranking import EmergencyDonorRanking
+from donor_store import DATA_DIR, load_gamification
+from donor_table import DonorTable
+from emergency_system import EmergencySystem
+from gamification import DonorGamificationSystem
+from kpi_cubes import SCORE_BIN_WIDTH, data_version, load_kpi_cubes
+from model_serving import DonorModelServer
+from pipeline_metrics import EMERGENCY_METRICS
+from propensity_scoring import load_propensity
+from response_cache import ResponseCache, forecast_key
+from supply_projection import SupplyProjection
+
+FORECAST_DAYS = 30
+# Head post office pincode of each simulator city
+CITY_PINCODES = {'Hyderabad': '500001', 'Bangalore': '560001', 'Mumbai': '400001', 'Delhi': '110001'}
 
 # Configure page
 st.set_page_config(
@@ -53,21 +73,28 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
-    """Load all the datasets and models"""
+# Resources keyed on the data version keep only the current one: a new version
+# (donor CSV or store rebuilt) reloads them and drops the old copies
+@st.cache_resource(max_entries=1)
+def load_data(version):
+    """Load all the datasets and models (once per data version)"""
     try:
-        # Load donor data
-        df_donors = pd.read_csv('/Users/lilyland/Downloads/setucare/hackathon_data.csv')
+        # Load donor data (columnar store -> compact int8-coded/float32 table)
+        df_donors = DonorTable.from_store().to_dataframe()
+
+        # Nightly donation likelihoods (python propensity_scoring.py), when current
+        propensity = load_propensity()
+        if propensity is not None and len(propensity) == len(df_donors):
+            df_donors['donation_likelihood'] = propensity['propensity'].to_numpy()
 
         # Load gamification data
-        df_gamification = pd.read_csv('/Users/lilyland/Downloads/setucare/donor_gamification_data.csv')
+        df_gamification = load_gamification()
 
         # Load feature importance
-        feature_importance = pd.read_csv('/Users/lilyland/Downloads/setucare/feature_importance.csv')
+        feature_importance = pd.read_csv(os.path.join(DATA_DIR, 'feature_importance.csv'))
 
         # Load model info
-        with open('/Users/lilyland/Downloads/setucare/model_info.json', 'r') as f:
+        with open(os.path.join(DATA_DIR, 'model_info.json'), 'r') as f:
             model_info = json.load(f)
 
         return df_donors, df_gamification, feature_importance, model_info
@@ -75,12 +102,22 @@ def load_data():
         st.error(f"Error loading data: {e}")
         return None, None, None, None
 
+def current_data_version():
+    """Cache key for resources derived from the donor store (its source signatures)"""
+    return json.dumps(data_version())
+
+@st.cache_resource(max_entries=1)
+def get_kpi_cubes(version):
+    """KPI cubes for a donor / gamification data version (see kpi_cubes.py)"""
+    return load_kpi_cubes()
+
 def main():
     # Header
     st.markdown('<h1 class="main-header">🩸 Blood Bridge Management Dashboard</h1>', unsafe_allow_html=True)
 
-    # Load data
-    df_donors, df_gamification, feature_importance, model_info = load_data()
+    # Load data; every page of this run reads the same data version
+    version = current_data_version()
+    df_donors, df_gamification, feature_importance, model_info = load_data(version)
 
     if df_donors is None:
         st.error("❌ Failed to load data. Please check file paths.")
@@ -99,40 +136,40 @@ def main():
     ])
 
     if page == "📊 Overview Dashboard":
-        show_overview_dashboard(df_donors, df_gamification, model_info)
+        show_overview_dashboard(get_kpi_cubes(version), model_info)
     elif page == "👥 Donor Analytics":
-        show_donor_analytics(df_donors, df_gamification)
+        show_donor_analytics(df_donors, df_gamification, version)
     elif page == "🚨 Emergency Management":
-        show_emergency_management(df_donors)
+        show_emergency_management(df_donors, version)
     elif page == "🏆 Gamification & Leaderboards":
-        show_gamification_dashboard(df_gamification)
+        show_gamification_dashboard(get_kpi_cubes(version))
     elif page == "🤖 ML Model Performance":
         show_ml_dashboard(feature_importance, model_info)
     elif page == "📈 Blood Demand Forecast":
-        show_forecast_dashboard(df_donors)
+        show_forecast_dashboard(df_donors, version)
     elif page == "⚙️ System Settings":
         show_system_settings()
 
-def show_overview_dashboard(df_donors, df_gamification, model_info):
+def show_overview_dashboard(kpis, model_info):
     st.header("📊 System Overview")
 
     # Key metrics in columns
     col1, col2, col3, col4 = st.columns(4)
 
     with col1:
-        total_donors = len(df_donors)
+        total_donors = kpis.total_donors()
         st.metric("👥 Total Donors", f"{total_donors:,}")
 
     with col2:
-        active_donors = len(df_donors[df_donors['user_donation_active_status'] == 'Active'])
+        active_donors = kpis.active_donors()
         st.metric("✅ Active Donors", f"{active_donors:,}")
 
     with col3:
-        total_donations = df_donors['donations_till_date'].sum()
+        total_donations = kpis.total_donations()
         st.metric("🩸 Total Donations", f"{total_donations:,.0f}")
 
     with col4:
-        avg_score = df_gamification['score'].mean()
+        avg_score = kpis.average_score()
         st.metric("⭐ Avg Donor Score", f"{avg_score:.0f}")
 
     st.divider()
@@ -143,7 +180,7 @@ def show_overview_dashboard(df_donors, df_gamification, model_info):
     with col1:
         # Blood group distribution
         st.subheader("🩸 Blood Group Distribution")
-        blood_counts = df_donors['blood_group'].value_counts().head(8)
+        blood_counts = kpis.counts_by('blood_group').head(8)
         fig_blood = px.pie(
             values=blood_counts.values,
             names=blood_counts.index,
@@ -155,7 +192,7 @@ def show_overview_dashboard(df_donors, df_gamification, model_info):
     with col2:
         # Donor roles
         st.subheader("👤 Donor Roles")
-        role_counts = df_donors['role'].value_counts()
+        role_counts = kpis.counts_by('role')
         fig_roles = px.bar(
             x=role_counts.index,
             y=role_counts.values,
@@ -168,11 +205,10 @@ def show_overview_dashboard(df_donors, df_gamification, model_info):
 
     # Recent activity timeline
     st.subheader("📅 Registration Timeline")
-    df_donors['registration_date'] = pd.to_datetime(df_donors['registration_date'])
-    monthly_reg = df_donors.groupby(df_donors['registration_date'].dt.to_period('M')).size()
+    monthly_reg = kpis.monthly_registrations()
 
     fig_timeline = px.line(
-        x=monthly_reg.index.astype(str),
+        x=monthly_reg.index,
         y=monthly_reg.values,
         title="Monthly Donor Registrations",
         labels={'x': 'Month', 'y': 'New Registrations'}
@@ -180,35 +216,34 @@ def show_overview_dashboard(df_donors, df_gamification, model_info):
     fig_timeline.update_traces(line_color='#e74c3c', line_width=3)
     st.plotly_chart(fig_timeline, use_container_width=True)
 
-def show_donor_analytics(df_donors, df_gamification):
+def show_donor_analytics(df_donors, df_gamification, version):
     st.header("👥 Donor Analytics")
 
+    query_index = get_query_index(df_donors, version)
+
     # Filters
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        blood_groups = ['All'] + list(df_donors['blood_group'].unique())
+        blood_groups = ['All'] + query_index.values('blood_group')
         selected_blood = st.selectbox("🩸 Filter by Blood Group:", blood_groups)
 
     with col2:
-        roles = ['All'] + list(df_donors['role'].unique())
+        roles = ['All'] + query_index.values('role')
         selected_role = st.selectbox("👤 Filter by Role:", roles)
 
     with col3:
         status_options = ['All', 'Active', 'Inactive']
         selected_status = st.selectbox("📊 Filter by Status:", status_options)
 
-    # Apply filters
-    filtered_df = df_donors.copy()
-    if selected_blood != 'All':
-        filtered_df = filtered_df[filtered_df['blood_group'] == selected_blood]
-    if selected_role != 'All':
-        filtered_df = filtered_df[filtered_df['role'] == selected_role]
-    if selected_status != 'All':
-        status_map = {'Active': 'Active', 'Inactive': 'Inactive'}
-        filtered_df = filtered_df[filtered_df['user_donation_active_status'] == status_map[selected_status]]
+    # Apply filters (posting-list intersection, cached per filter combination)
+    filters = {
+        'blood_group': None if selected_blood == 'All' else selected_blood,
+        'role': None if selected_role == 'All' else selected_role,
+        'user_donation_active_status': None if selected_status == 'All' else selected_status
+    }
 
-    st.info(f"📊 Showing {len(filtered_df)} donors (filtered from {len(df_donors)} total)")
+    st.info(f"📊 Showing {query_index.count(**filters)} donors (filtered from {len(df_donors)} total)")
 
     # Analytics charts
     col1, col2 = st.columns(2)
@@ -216,10 +251,10 @@ def show_donor_analytics(df_donors, df_gamification):
     with col1:
         # Donation distribution
         st.subheader("🎯 Donation Distribution")
-        donations = filtered_df['donations_till_date'].fillna(0)
-        fig_donations = px.histogram(
-            x=donations,
-            nbins=20,
+        donation_counts = query_index.donation_histogram(**filters)
+        fig_donations = px.bar(
+            x=donation_counts.index,
+            y=donation_counts.values,
             title="Number of Donations per Donor",
             labels={'x': 'Number of Donations', 'y': 'Number of Donors'}
         )
@@ -228,32 +263,38 @@ def show_donor_analytics(df_donors, df_gamification):
     with col2:
         # Geographic distribution
         st.subheader("📍 Geographic Distribution")
+        map_zoom = st.select_slider("🔍 Map detail (zoom):", list(GRID_LEVELS), value=DEFAULT_ZOOM)
+        # Every matching donor, aggregated per grid cell and blood group
+        map_cells = query_index.map_cells(map_zoom, **filters)
         fig_geo = px.scatter_mapbox(
-            filtered_df.dropna(subset=['latitude', 'longitude']).head(500),
+            map_cells,
             lat='latitude',
             lon='longitude',
             color='blood_group',
-            hover_data=['role', 'donations_till_date'],
+            size='donors',
+            hover_data=['donors'],
             mapbox_style='open-street-map',
             title="Donor Locations",
-            zoom=10
+            zoom=map_zoom
         )
         st.plotly_chart(fig_geo, use_container_width=True)
 
     # Top donors table
     st.subheader("🏆 Top Donors")
-    top_donors = filtered_df.nlargest(10, 'donations_till_date')[
-        ['user_id', 'blood_group', 'role', 'donations_till_date', 'user_donation_active_status']
-    ].rename(columns={
+    top_columns = ['user_id', 'blood_group', 'role', 'donations_till_date', 'user_donation_active_status']
+    if 'donation_likelihood' in df_donors.columns:
+        top_columns.append('donation_likelihood')
+    top_donors = df_donors.iloc[query_index.top_donors(10, **filters)][top_columns].rename(columns={
         'user_id': 'Donor ID',
         'blood_group': 'Blood Group',
         'role': 'Role',
         'donations_till_date': 'Total Donations',
-        'user_donation_active_status': 'Status'
+        'user_donation_active_status': 'Status',
+        'donation_likelihood': 'Donation Likelihood %'
     })
     st.dataframe(top_donors, use_container_width=True)
 
-def show_emergency_management(df_donors):
+def show_emergency_management(df_donors, version):
     st.header("🚨 Emergency Management System")
 
     # Emergency request simulator
@@ -268,7 +309,7 @@ def show_emergency_management(df_donors):
              'B Positive', 'B Negative', 'AB Positive', 'AB Negative']
         )
 
-        emergency_city = st.selectbox("🏙️ City:", ['Hyderabad', 'Bangalore', 'Mumbai', 'Delhi'])
+        emergency_city = st.selectbox("🏙️ City:", list(CITY_PINCODES))
 
         urgency_level = st.select_slider("⚡ Urgency Level:", ['Low', 'Medium', 'High', 'Critical'])
 
@@ -279,57 +320,82 @@ def show_emergency_management(df_donors):
         lat = st.number_input("Latitude:", value=17.3850, format="%.4f")
         lon = st.number_input("Longitude:", value=78.4867, format="%.4f")
 
-    if st.button("🚨 SEND EMERGENCY ALERT", type="primary"):
-        # Simulate emergency processing
-        compatible_donors = get_compatible_donors(df_donors, emergency_blood)
-
-        st.success(f"✅ Emergency alert sent!")
+    if st.button("🚨 PREPARE EMERGENCY ALERTS", type="primary"):
+        # Run the real emergency pipeline (parse -> geocode -> rank -> alerts);
+        # no dispatcher here, so the alerts are built but not sent
+        compatible_donors = get_compatible_donors(df_donors, emergency_blood, version)
+        message = f"HELP {to_short_blood_group(emergency_blood)} {CITY_PINCODES[emergency_city]}"
+        result = get_emergency_system(version).prepare_emergency_alerts(message)
+        latency = EMERGENCY_METRICS.stage_stats('end_to_end')
+
+        if result and result['status'] == 'success':
+            st.success(f"✅ {result['alerts_sent']} emergency alerts prepared (not sent from the dashboard)")
+        else:
+            st.error(f"❌ Emergency request failed: {(result or {}).get('message', 'not processed')}")
         st.info(f"📊 Found {len(compatible_donors)} compatible donors for {emergency_blood}")
 
         # Show emergency metrics
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            st.metric("⚡ Response Time", "2.3 sec")
+            st.metric("⚡ Response Time (p50)", f"{latency.get('p50_ms', 0):.0f} ms",
+                      help=f"p95 {latency.get('p95_ms', 0):.0f} ms · p99 {latency.get('p99_ms', 0):.0f} ms "
+                           f"over {latency['count']} requests")
 
         with col2:
-            st.metric("📱 Alerts Sent", min(10, len(compatible_donors)))
+            st.metric("📱 Alerts Prepared", (result or {}).get('alerts_sent', 0))
 
         with col3:
             estimated_response = min(8, len(compatible_donors) // 3)
             st.metric("📞 Expected Responses", estimated_response)
 
-        # Show top matching donors
-        if len(compatible_donors) > 0:
+        # Show the donors this request ranked highest, in alert priority order
+        if result and result['status'] == 'success' and result['top_donors']:
             st.subheader("🏆 Top 5 Matching Donors")
-            top_matches = compatible_donors.head(5)[
-                ['blood_group', 'role', 'donations_till_date', 'user_donation_active_status']
-            ].rename(columns={
+            match_columns = ['blood_group', 'role', 'donations_till_date', 'user_donation_active_status']
+            if 'donation_likelihood' in df_donors.columns:
+                match_columns.append('donation_likelihood')
+            top_ids = [alert['donor_id'] for alert in result['top_donors'][:5]]
+            ranked = df_donors[df_donors['user_id'].isin(top_ids)].drop_duplicates('user_id')
+            top_matches = ranked.set_index('user_id').reindex(top_ids)[match_columns].rename_axis('Donor ID').rename(columns={
                 'blood_group': 'Blood Group',
                 'role': 'Role', 
                 'donations_till_date': 'Donations',
-                'user_donation_active_status': 'Status'
+                'user_donation_active_status': 'Status',
+                'donation_likelihood': 'Likelihood %'
             })
             st.dataframe(top_matches, use_container_width=True)
 
-def get_compatible_donors(df_donors, blood_group):
-    """Get compatible donors for a blood group"""
-    compatibility = {
-        'O Negative': ['O Negative'],
-        'O Positive': ['O Negative', 'O Positive'],
-        'A Negative': ['O Negative', 'A Negative'],
-        'A Positive': ['O Negative', 'O Positive', 'A Negative', 'A Positive'],
-        'B Negative': ['O Negative', 'B Negative'],
-        'B Positive': ['O Negative', 'O Positive', 'B Negative', 'B Positive'],
-        'AB Negative': ['O Negative', 'A Negative', 'B Negative', 'AB Negative'],
-        'AB Positive': ['O Negative', 'O Positive', 'A Negative', 'A Positive', 
-                      'B Negative', 'B Positive', 'AB Negative', 'AB Positive']
-    }
-
-    compatible_groups = compatibility.get(blood_group, [blood_group])
-    return df_donors[df_donors['blood_group'].isin(compatible_groups)]
-
-def show_gamification_dashboard(df_gamification):
+    # Stage latencies of the requests handled by this dashboard process
+    stage_latency = EMERGENCY_METRICS.summary()
+    if stage_latency:
+        st.subheader("⏱️ Emergency Pipeline Latency")
+        latency_table = pd.DataFrame(stage_latency).T[['count', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms']]
+        st.dataframe(latency_table.round(2), use_container_width=True)
+
+@st.cache_resource(max_entries=1)
+def get_emergency_system(version):
+    """Emergency pipeline over the donor store, loaded once per data version"""
+    ranking = EmergencyDonorRanking.from_store(DonorModelServer.load(), DonorGamificationSystem())
+    return EmergencySystem(ranking)
+
+# The leading underscore keeps Streamlit from hashing the donor table on every
+# rerun; the data version the table was loaded at is the cache key instead
+@st.cache_resource(max_entries=1)
+def get_query_index(_df_donors, version):
+    """Filter posting lists for Donor Analytics, built once per data version"""
+    return DonorQueryIndex.from_dataframe(_df_donors)
+
+@st.cache_resource(max_entries=1)
+def get_compatibility_index(_df_donors, version):
+    """Blood-group partitions of the donor table, built once per data version"""
+    return CompatibilityIndex.from_dataframe(_df_donors)
+
+def get_compatible_donors(df_donors, blood_group, version):
+    """Get compatible donors for a blood group ('O+' or 'O Positive')"""
+    return get_compatibility_index(df_donors, version).select(df_donors, blood_group)
+
+def show_gamification_dashboard(kpis):
     st.header("🏆 Gamification & Leaderboards")
 
     # Top performers
@@ -337,15 +403,13 @@ def show_gamification_dashboard(df_gamification):
 
     with col1:
         st.subheader("🥇 Top 10 Donors by Score")
-        top_scores = df_gamification.nlargest(10, 'score')[
-            ['score', 'donations', 'badge_count', 'blood_group']
-        ].reset_index(drop=True)
+        top_scores = kpis.top_scores(10)
         top_scores.index += 1  # Start from 1
         st.dataframe(top_scores, use_container_width=True)
 
     with col2:
         st.subheader("🎖️ Badge Distribution")
-        badge_dist = df_gamification['badge_count'].value_counts().sort_index()
+        badge_dist = kpis.badge_distribution()
         fig_badges = px.bar(
             x=badge_dist.index,
             y=badge_dist.values,
@@ -359,21 +423,25 @@ def show_gamification_dashboard(df_gamification):
 
     with col1:
         st.subheader("📊 Score Distribution")
-        fig_score_dist = px.histogram(
-            df_gamification, 
-            x='score', 
-            nbins=30,
-            title="Donor Score Distribution"
+        score_bins = kpis.score_histogram()
+        fig_score_dist = px.bar(
+            x=score_bins.index + SCORE_BIN_WIDTH / 2,
+            y=score_bins.values,
+            title="Donor Score Distribution",
+            labels={'x': 'score', 'y': 'count'}
         )
+        fig_score_dist.update_traces(width=SCORE_BIN_WIDTH)
         st.plotly_chart(fig_score_dist, use_container_width=True)
 
     with col2:
         st.subheader("🩸 Donations vs Score")
+        # One bubble per (donations, score, blood group), sized by donor count
         fig_correlation = px.scatter(
-            df_gamification,
+            kpis.donations_vs_score(),
             x='donations',
             y='score',
             color='blood_group',
+            size='count',
             title="Relationship between Donations and Score"
         )
         st.plotly_chart(fig_correlation, use_container_width=True)
@@ -427,31 +495,22 @@ def show_ml_dashboard(feature_importance, model_info):
     st.subheader("ℹ️ Model Information")
     st.json(model_info)
 
-def show_forecast_dashboard(df_donors):
+def show_forecast_dashboard(df_donors, version):
     st.header("📈 Blood Demand Forecast")
 
-    st.info("🔧 Forecast model is under development. Showing simulated data for demonstration.")
-
-    # Simulate forecast data
-    dates = pd.date_range(start=datetime.now(), periods=30, freq='D')
-    blood_groups = ['O+', 'O-', 'A+', 'A-', 'B+', 'B-', 'AB+', 'AB-']
-
-    # Create simulated forecast
-    forecast_data = []
-    for date in dates:
-        for bg in blood_groups:
-            base_demand = np.random.normal(50, 15)  # Base demand
-            weekend_effect = 1.2 if date.weekday() >= 5 else 1.0
-            demand = max(0, int(base_demand * weekend_effect))
-
-            forecast_data.append({
-                'date': date,
-                'blood_group': bg,
-                'predicted_demand': demand,
-                'confidence_interval': np.random.uniform(0.8, 0.95)
-            })
+    forecaster = get_forecaster()
+    cache = get_response_cache()
+
+    if st.button("🔄 Retrain forecast models"):
+        forecaster.train_forecasting_models(load_demand_history())
+        cache.invalidate()
+
+    # Cached per (horizon, day, model version): reruns are a dictionary lookup
+    df_forecast = get_forecast_table(forecaster, FORECAST_DAYS)
 
-    df_forecast = pd.DataFrame(forecast_data)
+    stats = cache.stats()
+    st.caption(f"Model version {forecaster.model_version} · cache hits {stats['hits']} / "
+               f"misses {stats['misses']} ({stats['hit_rate']:.0%})")
 
     # Forecast visualization
     col1, col2 = st.columns(2)
@@ -485,20 +544,7 @@ def show_forecast_dashboard(df_donors):
     # Supply vs Demand analysis
     st.subheader("⚖️ Supply vs Demand Analysis")
 
-    supply_data = []
-    for bg in blood_groups:
-        compatible_donors = get_compatible_donors(df_donors, bg.replace('+', ' Positive').replace('-', ' Negative'))
-        active_donors = len(compatible_donors[compatible_donors['user_donation_active_status'] == 'Active'])
-        total_demand = df_forecast[df_forecast['blood_group'] == bg]['predicted_demand'].sum()
-
-        supply_data.append({
-            'blood_group': bg,
-            'active_donors': active_donors,
-            'predicted_demand': total_demand,
-            'supply_ratio': active_donors / max(1, total_demand) * 100
-        })
-
-    df_supply = pd.DataFrame(supply_data)
+    df_supply = get_supply_table(df_donors, version, forecaster, df_forecast, FORECAST_DAYS)
 
     fig_supply = px.bar(
         df_supply,
@@ -509,6 +555,63 @@ def show_forecast_dashboard(df_donors):
     )
     st.plotly_chart(fig_supply, use_container_width=True)
 
+    # Day-by-day stock: donors coming off their deferral join the supply
+    st.subheader("📉 Projected Stock")
+    for row in df_supply[df_supply['shortage_date'].notna()].sort_values('shortage_date').itertuples():
+        st.warning(f"⚠️ {row.blood_group}: projected shortage from {row.shortage_date:%d %b} "
+                   f"({row.projected_stock:,.0f} units by the end of the forecast)")
+
+    df_projection = get_supply_projection(df_donors, version, date.today()).project(df_forecast)
+    fig_stock = px.line(
+        df_projection,
+        x='date',
+        y='projected_stock',
+        color='blood_group',
+        title="Projected Stock by Blood Group (estimated supply - predicted demand)"
+    )
+    st.plotly_chart(fig_stock, use_container_width=True)
+
+@st.cache_resource
+def get_forecaster():
+    """Demand models trained once per dashboard process"""
+    forecaster = BloodDemandForecaster()
+    forecaster.train_forecasting_models(load_demand_history())
+    return forecaster
+
+@st.cache_resource
+def get_response_cache():
+    """Forecast/supply results shared across reruns and sessions"""
+    return ResponseCache()
+
+def get_forecast_table(forecaster, days):
+    """All blood groups, next `days` days"""
+    key = forecast_key('all', days, forecaster.model_version)
+    return get_response_cache().get_or_compute(key, lambda: forecaster.forecast_demand(days))
+
+@st.cache_resource(max_entries=1)
+def get_supply_projection(_df_donors, version, as_of):
+    """Per-group donor supply counts, rebuilt once per data version and day"""
+    return SupplyProjection.from_dataframe(_df_donors, as_of=as_of)
+
+def get_supply_table(df_donors, version, forecaster, df_forecast, days):
+    """Active compatible donors vs predicted demand per blood group, with projected shortage dates"""
+    def compute():
+        gaps = get_supply_projection(df_donors, version, date.today()).gap_analysis(df_forecast)
+        return pd.DataFrame({
+            'blood_group': gaps['blood_group'],
+            'active_donors': gaps['active_donors'],
+            'predicted_demand': gaps['total_predicted_demand'],
+            'supply_ratio': gaps['active_donors'] / np.maximum(1, gaps['total_predicted_demand']) * 100,
+            'supply_demand_ratio': gaps['supply_demand_ratio'],
+            'status': gaps['status'],
+            'projected_stock': gaps['projected_stock'],
+            'shortage_date': gaps['shortage_date']
+        })
+
+    # Same data version as the stock chart, so its shortage warnings match the chart
+    key = forecast_key('all', days, forecaster.model_version, kind='supply_demand', data_version=version)
+    return get_response_cache().get_or_compute(key, compute)
+
 def show_system_settings():
     st.header("⚙️ System Settings")
 
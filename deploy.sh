@@ -14,6 +14,14 @@ python3 --version
 echo "📦 Installing dependencies..."
 pip3 install -r requirements.txt
 
+# Compile donor CSVs into the memory-mapped columnar store
+echo "🗄️ Compiling donor store..."
+python3 donor_store.py
+
+# Precompute donor donation likelihoods (schedule nightly)
+echo "🤖 Scoring donor propensity..."
+python3 propensity_scoring.py
+
 echo "✅ Installation complete!"
 echo ""
 
@@ -26,12 +34,15 @@ echo ""
 echo "2. Access the dashboard at:"
 echo "   http://localhost:8501"
 echo ""
-echo "3. For emergency system testing:"
+echo "3. Start the JSON API for the React frontend:"
+echo "   python3 api_server.py 8000"
+echo ""
+echo "4. For emergency system testing:"
 echo "   python3 -c "from emergency_system import EmergencySystem; print('Emergency system ready!')""
 echo ""
 echo "📊 Available Features:"
 echo "- AI Donor Prediction (99.6% accuracy)"
-echo "- Emergency Response System (<3s response)"
+echo "- Emergency Response System (live p50/p95/p99 per stage at /metrics)"
 echo "- Gamification & Leaderboards"
 echo "- 30-day Blood Demand Forecasting"
 echo "- Real-time Analytics Dashboard"
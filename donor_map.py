@@ -0,0 +1,88 @@
+# donor_map.py
+# Grid aggregation of donor locations for the dashboard map. Each donor's grid
+# cell is computed once per zoom level; a map request then bins the matching
+# donors into (cell, blood group) aggregates with one bincount, so the browser
+# gets a few hundred bubbles instead of raw points and every donor is counted.
+import numpy as np
+import pandas as pd
+
+# Map zoom level -> grid cell size in degrees
+GRID_LEVELS = {
+    4: 1.0,      # country
+    7: 0.1,      # region / city
+    10: 0.02,    # neighbourhood
+    13: 0.0025   # street
+}
+DEFAULT_ZOOM = 10
+# Most aggregates sent to the browser; finer levels over this fall back to a coarser grid
+MAX_MAP_CELLS = 5000
+# Map group of donors without a blood group, so every located donor is counted
+UNKNOWN_BLOOD_GROUP = 'Unknown'
+
+
+class DonorMapGrid:
+    """
+    Per-zoom grid cells of a donor table
+    Cells are numbered densely per level (-1 = no coordinates); donors without
+    a blood group are mapped as UNKNOWN_BLOOD_GROUP. Positions passed to
+    cells() are row positions of the indexed DataFrame.
+    """
+
+    def __init__(self, df, levels=GRID_LEVELS):
+        self.latitude = pd.to_numeric(pd.Series(df['latitude']), errors='coerce').to_numpy(dtype=float)
+        self.longitude = pd.to_numeric(pd.Series(df['longitude']), errors='coerce').to_numpy(dtype=float)
+        located = ~(np.isnan(self.latitude) | np.isnan(self.longitude))
+
+        group_codes, group_names = pd.factorize(pd.Series(df['blood_group']), use_na_sentinel=True)
+        self.group_names = group_names.tolist()
+        if UNKNOWN_BLOOD_GROUP not in self.group_names:
+            self.group_names.append(UNKNOWN_BLOOD_GROUP)
+        self.group_codes = np.where(group_codes >= 0, group_codes, self.group_names.index(UNKNOWN_BLOOD_GROUP))
+
+        self.levels = {}
+        for zoom, cell_deg in levels.items():
+            rows = np.floor(np.where(located, self.latitude, 0) / cell_deg).astype(np.int64)
+            cols = np.floor(np.where(located, self.longitude, 0) / cell_deg).astype(np.int64)
+            # Row/column pairs -> dense cell numbers
+            keys = rows * 2 ** 32 + cols
+            cells = np.full(len(keys), -1, dtype=np.int64)
+            cells[located] = pd.factorize(keys[located])[0]
+            self.levels[zoom] = cells
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls(df)
+
+    def nearest_zoom(self, zoom):
+        return min(self.levels, key=lambda level: abs(level - zoom))
+
+    def aggregate(self, zoom=DEFAULT_ZOOM, positions=None, max_cells=MAX_MAP_CELLS):
+        """cells() at the finest level up to zoom that stays within max_cells aggregates"""
+        levels = sorted(level for level in self.levels if level <= self.nearest_zoom(zoom))
+        for level in reversed(levels):
+            cells = self.cells(level, positions)
+            if len(cells) <= max_cells or level == levels[0]:
+                return cells
+
+    def cells(self, zoom=DEFAULT_ZOOM, positions=None):
+        """
+        One row per (grid cell, blood group) among the given donors (all when
+        positions is None): latitude / longitude (mean of the donors in it),
+        blood_group, donors
+        """
+        rows = slice(None) if positions is None else np.asarray(positions)
+        cell = self.levels[self.nearest_zoom(zoom)][rows]
+        group = self.group_codes[rows]
+        latitude = self.latitude[rows]
+        longitude = self.longitude[rows]
+
+        keep = cell >= 0
+        n_groups = len(self.group_names)
+        codes, keys = pd.factorize(cell[keep] * n_groups + group[keep])
+        donors = np.bincount(codes, minlength=len(keys))
+        return pd.DataFrame({
+            'latitude': np.bincount(codes, weights=latitude[keep], minlength=len(keys)) / donors,
+            'longitude': np.bincount(codes, weights=longitude[keep], minlength=len(keys)) / donors,
+            'blood_group': np.array(self.group_names, dtype=object)[keys % n_groups],
+            'donors': donors
+        })
@@ -0,0 +1,113 @@
+# donor_query.py
+# Indexed filtering for the dashboard's Donor Analytics page. Every filter
+# column is partitioned once into per-value posting lists (sorted row
+# positions) and donors are pre-sorted by donations, so any filter combination
+# is answered by intersecting a few posting lists - no frame copy, no
+# full-table boolean masks. Results are memoized per filter tuple.
+import numpy as np
+import pandas as pd
+
+from donor_map import DEFAULT_ZOOM, DonorMapGrid
+
+FILTER_COLUMNS = ['blood_group', 'role', 'user_donation_active_status']
+# Filter tuples whose results are kept (oldest dropped first)
+QUERY_CACHE_SIZE = 256
+
+
+class DonorQueryIndex:
+    """
+    Posting lists over the filter columns of a donor table
+    Positions are row positions of the indexed DataFrame; filters map a
+    column in FILTER_COLUMNS to one value (None = any value).
+    """
+
+    def __init__(self, df, filter_columns=FILTER_COLUMNS):
+        self.n_rows = len(df)
+        self.postings = {}
+        for column in filter_columns:
+            codes, uniques = pd.factorize(pd.Series(df[column]), use_na_sentinel=True)
+            # Stable sort keeps every posting list in table order
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+            start = int((codes < 0).sum())  # missing values sort first
+            postings = {}
+            for value, count in zip(uniques.tolist(), counts):
+                postings[value] = order[start:start + int(count)]
+                start += int(count)
+            self.postings[column] = postings
+
+        donations = pd.to_numeric(pd.Series(df['donations_till_date']), errors='coerce').to_numpy(dtype=float)
+        self.donations = np.nan_to_num(donations, nan=0.0)
+        # Descending donations, table order among ties, missing values last (as nlargest orders them)
+        self.by_donations = np.argsort(np.where(np.isnan(donations), np.inf, -donations), kind='stable')
+        self.donation_rank = np.empty(self.n_rows, dtype=np.int64)
+        self.donation_rank[self.by_donations] = np.arange(self.n_rows)
+
+        self.map_grid = DonorMapGrid.from_dataframe(df)
+        self._cache = {}
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls(df)
+
+    def values(self, column):
+        """Distinct values of a filter column, in order of first appearance"""
+        return list(self.postings[column])
+
+    def _cached(self, key, compute):
+        if key not in self._cache:
+            if len(self._cache) >= QUERY_CACHE_SIZE:
+                self._cache.pop(next(iter(self._cache)))
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @staticmethod
+    def _filter_key(filters):
+        return tuple(sorted((column, value) for column, value in filters.items() if value is not None))
+
+    def positions(self, **filters):
+        """Sorted row positions matching every filter"""
+        key = self._filter_key(filters)
+        return self._cached(('positions', key), lambda: self._intersect(key))
+
+    def _intersect(self, key):
+        if not key:
+            return np.arange(self.n_rows)
+        # Smallest posting list first keeps every intersection short
+        lists = sorted((self.postings[column].get(value, np.empty(0, dtype=np.int64)) for column, value in key),
+                       key=len)
+        result = lists[0]
+        for posting in lists[1:]:
+            result = np.intersect1d(result, posting, assume_unique=True)
+        return result
+
+    def count(self, **filters):
+        return len(self.positions(**filters))
+
+    def donation_histogram(self, **filters):
+        """Donors per donation count (missing donations count as 0)"""
+        key = self._filter_key(filters)
+
+        def compute():
+            counts = np.bincount(self.donations[self.positions(**filters)].astype(np.int64))
+            present = np.flatnonzero(counts)
+            return pd.Series(counts[present], index=present, name='donors')
+        return self._cached(('donation_histogram', key), compute)
+
+    def top_donors(self, n=10, **filters):
+        """Row positions of the n matching donors with most donations (nlargest order)"""
+        key = self._filter_key(filters)
+
+        def compute():
+            ranks = self.donation_rank[self.positions(**filters)]
+            if len(ranks) > n:
+                ranks = np.partition(ranks, n - 1)[:n]
+            return self.by_donations[np.sort(ranks)]
+        return self._cached(('top_donors', n, key), compute)
+
+    def map_cells(self, zoom=DEFAULT_ZOOM, **filters):
+        """Matching donors aggregated per (grid cell, blood group) for a map zoom level (see DonorMapGrid.aggregate)"""
+        key = self._filter_key(filters)
+        zoom = self.map_grid.nearest_zoom(zoom)
+        positions = self.positions(**filters) if key else None
+        return self._cached(('map_cells', zoom, key), lambda: self.map_grid.aggregate(zoom, positions))
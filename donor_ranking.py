@@ -0,0 +1,390 @@
+import time
+
+import numpy as np
+import pandas as pd
+from geopy.distance import geodesic
+
+from blood_compatibility import CompatibilityIndex
+from donor_store import STORE_DIR
+from donor_table import DonorTable
+from ml_features import load_label_encoders
+from model_serving import DonorModelServer
+from pipeline_metrics import EMERGENCY_METRICS
+from propensity_scoring import load_propensity
+from spatial_index import DonorSpatialIndex, EARTH_RADIUS_KM
+
+# Weights used to blend the individual scores into the composite score
+RANKING_WEIGHTS = {
+    'distance': 0.3,
+    'availability': 0.25,
+    'reliability': 0.25,
+    'ml_prediction': 0.2
+}
+
+RANKING_COLUMNS = [
+    'user_id', 'blood_group', 'distance_score', 'availability_score',
+    'reliability_score', 'ml_prediction_score', 'composite_score',
+    'latitude', 'longitude', 'donations_count', 'role'
+]
+
+
+def haversine_km(lat, lon, ref_lat, ref_lon):
+    """Great-circle distance in km from arrays of points to a reference point"""
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lon = np.radians(np.asarray(lon, dtype=float))
+    ref_lat, ref_lon = np.radians(ref_lat), np.radians(ref_lon)
+
+    a = (np.sin((lat - ref_lat) / 2) ** 2 +
+         np.cos(lat) * np.cos(ref_lat) * np.sin((lon - ref_lon) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def _column(df, name, default):
+    """Column values as an array, or the default when the column is missing"""
+    if name in df.columns:
+        return df[name].to_numpy()
+    return np.full(len(df), default, dtype=object)
+
+
+def _numeric_column(df, name, default):
+    """Numeric column as float array (NaN kept), or the default when missing"""
+    if name in df.columns:
+        return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float)
+    return np.full(len(df), default, dtype=float)
+
+
+class EmergencyDonorRanking:
+    """
+    AI-powered donor ranking system for emergency blood requests
+    Considers: location, availability, reliability, donation history
+    """
+
+    def __init__(self, rf_model, df_donors, gamification_system, propensity=None):
+        # rf_model: the scikit-learn forest or a DonorModelServer wrapping it
+        # propensity: precomputed 0-100 likelihoods per donor row (propensity_scoring.py)
+        if isinstance(rf_model, DonorModelServer):
+            self.model_server = rf_model
+        else:
+            self.model_server = DonorModelServer(rf_model, load_label_encoders())
+        self.rf_model = self.model_server.rf_model
+        # A DonorTable keeps ids as 32-byte binary; they are decoded only for ranked rows
+        self.donor_table = df_donors if isinstance(df_donors, DonorTable) else None
+        if self.donor_table is not None:
+            df_donors = self.donor_table.to_dataframe(decode_ids=False)
+        self.df_donors = df_donors
+        self.gamification = gamification_system
+        if propensity is not None and len(propensity) != len(df_donors):
+            raise ValueError(f"{len(propensity)} propensity scores for {len(df_donors)} donors")
+        self.propensity = None if propensity is None else np.asarray(propensity, dtype=float)
+        # Built once so emergencies only touch donors inside the search radius
+        self.spatial_index = DonorSpatialIndex.from_dataframe(df_donors)
+        self.compatibility_index = CompatibilityIndex.from_dataframe(df_donors)
+        # Stage latencies (compatibility_filter, scoring, model_inference)
+        self.metrics = EMERGENCY_METRICS
+
+    @classmethod
+    def from_store(cls, rf_model, gamification_system, store_dir=STORE_DIR):
+        """
+        Ranking system over the memory-mapped donor store (see donor_store.py),
+        using the nightly propensity scores when they are current
+        """
+        ranking = cls(rf_model, DonorTable.from_store(store_dir), gamification_system)
+        version = ranking.model_server.version  # None for an in-memory forest
+        propensity = load_propensity(version, store_dir) if version else None
+        if propensity is not None and len(propensity) == len(ranking.df_donors):
+            ranking.propensity = propensity['propensity'].to_numpy(dtype=float)
+        return ranking
+
+    def calculate_distance_score(self, donor_lat, donor_lon, emergency_lat, emergency_lon):
+        """Calculate distance-based score (closer = higher score)"""
+        try:
+            distance = geodesic((donor_lat, donor_lon), (emergency_lat, emergency_lon)).kilometers
+            # Score decreases with distance, max score at 0km, min at 50km+
+            if distance <= 5:
+                return 100
+            elif distance <= 15:
+                return 80
+            elif distance <= 30:
+                return 60
+            elif distance <= 50:
+                return 40
+            else:
+                return 20
+        except:
+            return 20  # Default low score for invalid coordinates
+
+    def calculate_availability_score(self, donor_data):
+        """Calculate availability based on eligibility and recent activity"""
+        score = 0
+
+        # Check eligibility status
+        if donor_data.get('eligibility_status') == 'eligible':
+            score += 50
+        elif donor_data.get('eligibility_status') == 'not eligible':
+            score -= 30
+
+        # Check recent donation activity
+        if donor_data.get('user_donation_active_status') == 'Active':
+            score += 30
+
+        # Check if it's an emergency donor (more likely to respond)
+        if donor_data.get('role') == 'Emergency Donor':
+            score += 40
+        elif donor_data.get('role') == 'Bridge Donor':
+            score += 20
+
+        return max(score, 0)  # Ensure non-negative
+
+    def calculate_reliability_score(self, donor_data):
+        """Calculate reliability based on donation history"""
+        score = 0
+
+        # Call-to-donation ratio (lower is better)
+        ratio = donor_data.get('calls_to_donations_ratio', 2)
+        if ratio <= 0.5:
+            score += 50  # Very reliable
+        elif ratio <= 1:
+            score += 30  # Good reliability
+        elif ratio <= 2:
+            score += 10  # Average reliability
+        else:
+            score -= 20  # Poor reliability
+
+        # Total donations (more experience = better)
+        donations = donor_data.get('donations_till_date', 0)
+        if donations >= 10:
+            score += 30
+        elif donations >= 5:
+            score += 20
+        elif donations >= 1:
+            score += 10
+
+        # Recent donation activity
+        frequency = donor_data.get('frequency_in_days', 365)
+        if frequency <= 90:  # Donated within 3 months
+            score += 20
+        elif frequency <= 180:  # Donated within 6 months
+            score += 10
+
+        return max(score, 0)
+
+    def predict_donation_likelihood(self, donor_features):
+        """Use ML model to predict donation likelihood (one row of build_feature_matrix)"""
+        # Missing values are filled with 0 by the model server
+        probability = self.model_server.predict_proba(donor_features)[0]
+        return probability * 100  # Convert to 0-100 scale
+
+    def rank_donors_for_emergency(self, emergency_request, vectorized=False):
+        """
+        Rank all eligible donors for an emergency request
+        emergency_request: {
+            'blood_group': 'O+',
+            'latitude': 17.4065,
+            'longitude': 78.4772,
+            'urgency': 'high',
+            'quantity': '2 units'
+        }
+        Set vectorized=True to score the whole pool in one pass
+        (see rank_donors_vectorized); the result format is the same.
+        """
+        if vectorized:
+            return self.rank_donors_vectorized(emergency_request).to_dict('records')
+
+        # Filter compatible blood group donors
+        compatible_donors = self.get_compatible_donors(emergency_request['blood_group'])
+
+        donor_rankings = []
+        user_ids = self.get_user_ids(compatible_donors)
+        feature_matrix = self.build_feature_matrix(compatible_donors)
+
+        for user_id, donor_features, (_, donor) in zip(user_ids, feature_matrix, compatible_donors.iterrows()):
+            # Calculate individual scores
+            distance_score = self.calculate_distance_score(
+                donor['latitude'], donor['longitude'],
+                emergency_request['latitude'], emergency_request['longitude']
+            )
+
+            availability_score = self.calculate_availability_score(donor)
+            reliability_score = self.calculate_reliability_score(donor)
+
+            ml_score = self.predict_donation_likelihood(donor_features)
+
+            # Calculate composite score with weights
+            composite_score = (
+                distance_score * RANKING_WEIGHTS['distance'] +
+                availability_score * RANKING_WEIGHTS['availability'] +
+                reliability_score * RANKING_WEIGHTS['reliability'] +
+                ml_score * RANKING_WEIGHTS['ml_prediction']
+            )
+
+            # Add urgency multiplier
+            if emergency_request.get('urgency') == 'high':
+                composite_score *= 1.1
+
+            donor_rankings.append({
+                'user_id': user_id,
+                'blood_group': donor['blood_group'],
+                'distance_score': distance_score,
+                'availability_score': availability_score,
+                'reliability_score': reliability_score,
+                'ml_prediction_score': ml_score,
+                'composite_score': composite_score,
+                'latitude': donor['latitude'],
+                'longitude': donor['longitude'],
+                'donations_count': donor.get('donations_till_date', 0),
+                'role': donor.get('role', 'Unknown')
+            })
+
+        # Sort by composite score (highest first)
+        donor_rankings.sort(key=lambda x: x['composite_score'], reverse=True)
+
+        return donor_rankings
+
+    def get_nearby_compatible_donors(self, requested_blood_group, latitude, longitude, radius_km):
+        """Compatible donors within radius_km of the emergency, nearest first"""
+        positions, _ = self.spatial_index.query_radius(latitude, longitude, radius_km)
+        compatible = self.compatibility_index.is_compatible(positions, requested_blood_group)
+        return self.df_donors.iloc[positions[compatible]]
+
+    def rank_donors_vectorized(self, emergency_request, donors=None, max_radius_km=None):
+        """
+        Batch ranking mode: score the whole compatible pool in one pass.
+        Uses array haversine distances, column-wise score rules and a single
+        predict_proba call. Returns a DataFrame sorted by composite_score
+        (highest first, ties keep table order like the per-row path).
+        Haversine uses a spherical earth, so a donor sitting within a few
+        metres of a 5/15/30/50 km boundary can land in the neighbouring
+        bucket compared to geodesic.
+        With max_radius_km only donors inside that radius are scored (looked
+        up through the spatial index, equal scores stay nearest first).
+        """
+        with self.metrics.time('compatibility_filter'):
+            if donors is None and max_radius_km is not None:
+                donors = self.get_nearby_compatible_donors(
+                    emergency_request['blood_group'],
+                    emergency_request['latitude'], emergency_request['longitude'],
+                    max_radius_km
+                )
+            elif donors is None:
+                donors = self.get_compatible_donors(emergency_request['blood_group'])
+
+        if len(donors) == 0:
+            return pd.DataFrame(columns=RANKING_COLUMNS)
+
+        started = time.perf_counter()
+        distance_scores = self.calculate_distance_scores(
+            _numeric_column(donors, 'latitude', np.nan),
+            _numeric_column(donors, 'longitude', np.nan),
+            emergency_request['latitude'], emergency_request['longitude']
+        )
+        availability_scores = self.calculate_availability_scores(donors)
+        reliability_scores = self.calculate_reliability_scores(donors)
+        scoring_seconds = time.perf_counter() - started
+        with self.metrics.time('model_inference'):
+            ml_scores = self.donation_likelihoods(donors)
+
+        started = time.perf_counter()
+        composite_scores = (
+            distance_scores * RANKING_WEIGHTS['distance'] +
+            availability_scores * RANKING_WEIGHTS['availability'] +
+            reliability_scores * RANKING_WEIGHTS['reliability'] +
+            ml_scores * RANKING_WEIGHTS['ml_prediction']
+        )
+
+        if emergency_request.get('urgency') == 'high':
+            composite_scores = composite_scores * 1.1
+
+        rankings = pd.DataFrame({
+            'user_id': self.get_user_ids(donors),
+            'blood_group': donors['blood_group'].to_numpy(),
+            'distance_score': distance_scores,
+            'availability_score': availability_scores,
+            'reliability_score': reliability_scores,
+            'ml_prediction_score': ml_scores,
+            'composite_score': composite_scores,
+            'latitude': donors['latitude'].to_numpy(),
+            'longitude': donors['longitude'].to_numpy(),
+            'donations_count': _column(donors, 'donations_till_date', 0),
+            'role': _column(donors, 'role', 'Unknown')
+        })
+
+        order = np.argsort(-composite_scores, kind='stable')
+        rankings = rankings.iloc[order].reset_index(drop=True)
+        # Rule-based scores, blending and sorting (model time excluded)
+        self.metrics.observe('scoring', scoring_seconds + time.perf_counter() - started)
+        return rankings
+
+    def calculate_distance_scores(self, donor_lats, donor_lons, emergency_lat, emergency_lon):
+        """Vectorized calculate_distance_score (NaN coordinates score 20)"""
+        distances = haversine_km(donor_lats, donor_lons, emergency_lat, emergency_lon)
+        with np.errstate(invalid='ignore'):
+            return np.select(
+                [distances <= 5, distances <= 15, distances <= 30, distances <= 50],
+                [100, 80, 60, 40],
+                default=20
+            ).astype(float)
+
+    def calculate_availability_scores(self, donors):
+        """Vectorized calculate_availability_score"""
+        eligibility = _column(donors, 'eligibility_status', None)
+        status = _column(donors, 'user_donation_active_status', None)
+        role = _column(donors, 'role', None)
+
+        scores = np.select(
+            [eligibility == 'eligible', eligibility == 'not eligible'], [50, -30], default=0
+        )
+        scores = scores + np.where(status == 'Active', 30, 0)
+        scores = scores + np.select(
+            [role == 'Emergency Donor', role == 'Bridge Donor'], [40, 20], default=0
+        )
+        return np.maximum(scores, 0).astype(float)
+
+    def calculate_reliability_scores(self, donors):
+        """Vectorized calculate_reliability_score (NaN behaves like the scalar rules)"""
+        ratio = _numeric_column(donors, 'calls_to_donations_ratio', 2)
+        donations = _numeric_column(donors, 'donations_till_date', 0)
+        frequency = _numeric_column(donors, 'frequency_in_days', 365)
+
+        with np.errstate(invalid='ignore'):
+            scores = np.select(
+                [ratio <= 0.5, ratio <= 1, ratio <= 2], [50, 30, 10], default=-20
+            )
+            scores = scores + np.select(
+                [donations >= 10, donations >= 5, donations >= 1], [30, 20, 10], default=0
+            )
+            scores = scores + np.select(
+                [frequency <= 90, frequency <= 180], [20, 10], default=0
+            )
+        return np.maximum(scores, 0).astype(float)
+
+    def build_feature_matrix(self, donors):
+        """
+        Model feature matrix for a donor frame: derived day counts and the
+        saved label encodings, as in training (missing values filled with 0)
+        """
+        return self.model_server.build_features(donors)
+
+    def predict_donation_likelihoods(self, feature_matrix):
+        """Batched predict_donation_likelihood: one compiled-forest call for all donors"""
+        return self.model_server.predict_proba(feature_matrix) * 100
+
+    def donation_likelihoods(self, donors):
+        """
+        0-100 likelihoods for a slice of df_donors: the precomputed propensity
+        scores when loaded, else a live model call
+        """
+        if self.propensity is not None:
+            positions = self.df_donors.index.get_indexer(donors.index)
+            if (positions >= 0).all():
+                return self.propensity[positions]
+        return self.predict_donation_likelihoods(self.build_feature_matrix(donors))
+
+    def get_user_ids(self, donors):
+        """user_id values for a slice of the donor frame"""
+        if 'user_id' in donors.columns:
+            return donors['user_id'].to_numpy()
+        return self.donor_table.decode_user_ids(donors.index)
+
+    def get_compatible_donors(self, requested_blood_group):
+        """Get donors compatible with requested blood group ('O+' or 'O Positive')"""
+        return self.compatibility_index.select(self.df_donors, requested_blood_group)
@@ -0,0 +1,299 @@
+# donor_store.py
+# Columnar binary donor store: `python donor_store.py` compiles the donor CSVs
+# into per-column .npy files plus a manifest.json (dtypes and the dictionaries
+# of encoded categoricals). Loaders memory-map the columns instead of parsing
+# CSV, and fall back to the CSV when the store is missing or stale.
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.environ.get('BLOOD_BRIDGE_DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+STORE_DIR = os.environ.get('BLOOD_BRIDGE_STORE_DIR', os.path.join(DATA_DIR, 'donor_store'))
+
+DONORS_CSV = os.path.join(DATA_DIR, 'hackathon_data.csv')
+GAMIFICATION_CSV = os.path.join(DATA_DIR, 'donor_gamification_data.csv')
+
+STORE_FORMAT_VERSION = 1
+
+# String columns with more distinct values than this share of rows are stored
+# as fixed-width bytes instead of dictionary codes (e.g. user_id)
+MAX_CATEGORY_RATIO = 0.5
+
+
+# Parsed once at compile time and stored as datetime64[ns]
+DATE_COLUMNS = [
+    'last_transfusion_date', 'expected_next_transfusion_date', 'registration_date',
+    'last_contacted_date', 'last_donation_date', 'next_eligible_date',
+    'last_bridge_donation_date'
+]
+
+
+def _encode_column(position, name, series, table_dir):
+    """Write one column to table_dir and return its manifest entry"""
+    entry = {'name': name, 'file': f'{position:03d}.npy'}
+    path = os.path.join(table_dir, entry['file'])
+
+    if name in DATE_COLUMNS:
+        values = pd.to_datetime(series, errors='coerce', format='mixed').to_numpy(dtype='datetime64[ns]')
+        entry['kind'] = 'datetime'
+    elif not isinstance(series.dtype, pd.CategoricalDtype) and (
+            pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series)):
+        values = series.to_numpy()
+        entry['kind'] = 'numeric'
+    elif (isinstance(series.dtype, pd.CategoricalDtype) or
+          series.nunique(dropna=True) <= max(1, len(series) * MAX_CATEGORY_RATIO)):
+        codes, categories = pd.factorize(series, use_na_sentinel=True)
+        values = codes.astype(np.int32)
+        entry['kind'] = 'category'
+        entry['categories'] = categories.tolist()
+    else:
+        encoded = [b'' if pd.isna(v) else str(v).encode('utf-8') for v in series]
+        width = max((len(v) for v in encoded), default=1) or 1
+        values = np.array(encoded, dtype=f'S{width}')
+        entry['kind'] = 'bytes'
+
+    entry['dtype'] = values.dtype.str
+    np.save(path, values, allow_pickle=False)
+    return entry
+
+
+def write_table(df, table_dir, **metadata):
+    """Write a DataFrame as a columnar table; metadata is stored in the manifest"""
+    os.makedirs(table_dir, exist_ok=True)
+    for old_file in os.listdir(table_dir):
+        os.remove(os.path.join(table_dir, old_file))
+
+    columns = [_encode_column(i, name, df[name], table_dir) for i, name in enumerate(df.columns)]
+
+    manifest = dict(metadata, version=STORE_FORMAT_VERSION, n_rows=len(df),
+                    written_at=time.time(), columns=columns)
+    with open(os.path.join(table_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+class TableWriter:
+    """
+    Columnar table written chunk by chunk, for tables too large to build in memory
+    schema: {name: {'kind': 'numeric' | 'datetime' | 'category' | 'bytes',
+                    'dtype': numpy dtype string (numeric / bytes),
+                    'categories': [...] (category)}}
+    Chunks are DataFrames or {name: array} dicts. Category codes come from the
+    declared category list (other values are stored as missing) and bytes
+    values longer than their dtype are truncated. The manifest is written by
+    close(); until then the table reads as missing.
+    """
+
+    def __init__(self, table_dir, n_rows, schema, **metadata):
+        self.table_dir = table_dir
+        self.n_rows = n_rows
+        self.schema = schema
+        self.metadata = metadata
+        self.rows_written = 0
+        self.manifest = None
+
+        os.makedirs(table_dir, exist_ok=True)
+        for old_file in os.listdir(table_dir):
+            os.remove(os.path.join(table_dir, old_file))
+
+        self.entries = []
+        self.arrays = {}
+        for position, (name, spec) in enumerate(schema.items()):
+            entry = {'name': name, 'file': f'{position:03d}.npy', 'kind': spec['kind']}
+            if spec['kind'] == 'datetime':
+                dtype = np.dtype('datetime64[ns]')
+            elif spec['kind'] == 'category':
+                dtype = np.dtype(np.int32)
+                entry['categories'] = list(spec['categories'])
+            else:
+                dtype = np.dtype(spec['dtype'])
+            entry['dtype'] = dtype.str
+            self.entries.append(entry)
+            self.arrays[name] = np.lib.format.open_memmap(
+                os.path.join(table_dir, entry['file']), mode='w+', dtype=dtype, shape=(n_rows,)
+            )
+
+    def _encode(self, entry, values):
+        values = np.asarray(values)
+        if entry['kind'] == 'datetime':
+            if values.dtype.kind == 'M':
+                return values.astype('datetime64[ns]')
+            return pd.to_datetime(values, errors='coerce', format='mixed').to_numpy(dtype='datetime64[ns]')
+        if entry['kind'] == 'category':
+            return pd.Categorical(values, categories=entry['categories']).codes
+        if entry['kind'] == 'bytes':
+            if values.dtype.kind == 'S':
+                return values.astype(entry['dtype'])
+            return np.array([b'' if pd.isna(v) else str(v).encode('utf-8') for v in values], dtype=entry['dtype'])
+        return values.astype(entry['dtype'])
+
+    def write(self, chunk):
+        """Append a chunk holding every schema column"""
+        n_rows = len(chunk[self.entries[0]['name']])
+        start, stop = self.rows_written, self.rows_written + n_rows
+        if stop > self.n_rows:
+            raise ValueError(f"Table {self.table_dir} declared {self.n_rows} rows, got {stop}")
+        for entry in self.entries:
+            self.arrays[entry['name']][start:stop] = self._encode(entry, chunk[entry['name']])
+        self.rows_written = stop
+
+    def close(self):
+        """Flush the columns and write the manifest; returns it"""
+        if self.rows_written != self.n_rows:
+            raise ValueError(f"Table {self.table_dir} declared {self.n_rows} rows, got {self.rows_written}")
+        for array in self.arrays.values():
+            array.flush()
+        self.arrays = {}
+        self.manifest = dict(self.metadata, version=STORE_FORMAT_VERSION, n_rows=self.n_rows,
+                             written_at=time.time(), columns=self.entries)
+        with open(os.path.join(self.table_dir, 'manifest.json'), 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        return self.manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+
+def compile_table(csv_path, table_dir):
+    """Parse a CSV once and write it as a columnar table"""
+    return write_table(
+        pd.read_csv(csv_path), table_dir,
+        source=os.path.basename(csv_path),
+        source_mtime=os.path.getmtime(csv_path),
+        source_size=os.path.getsize(csv_path)
+    )
+
+
+def compile_store(store_dir=STORE_DIR):
+    """Compile both donor CSVs into the store"""
+    return {
+        'donors': compile_table(DONORS_CSV, os.path.join(store_dir, 'donors')),
+        'gamification': compile_table(GAMIFICATION_CSV, os.path.join(store_dir, 'gamification'))
+    }
+
+
+def read_manifest(table_dir):
+    """Manifest of a compiled table, or None if the table has not been compiled"""
+    try:
+        with open(os.path.join(table_dir, 'manifest.json'), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('version') == STORE_FORMAT_VERSION else None
+
+
+def is_fresh(table_dir, csv_path):
+    """True when the compiled table exists and matches its source CSV"""
+    manifest = read_manifest(table_dir)
+    if manifest is None:
+        return False
+    if manifest.get('source') is None:
+        return True  # written by write_table from generated data, not compiled from a CSV
+    if not os.path.exists(csv_path):
+        return True  # store shipped without its source
+    return (manifest['source_mtime'] == os.path.getmtime(csv_path) and
+            manifest['source_size'] == os.path.getsize(csv_path))
+
+
+def source_signature(name, csv_path, store_dir=STORE_DIR):
+    """(mtime, size) of a table's source data, to tell whether data derived from it is stale"""
+    manifest = read_manifest(os.path.join(store_dir, name))
+    if manifest is not None and manifest.get('source') is None:
+        return manifest.get('written_at'), manifest.get('n_rows')  # generated table
+    if os.path.exists(csv_path):
+        return os.path.getmtime(csv_path), os.path.getsize(csv_path)
+    manifest = manifest or {}
+    return manifest.get('source_mtime'), manifest.get('source_size')
+
+
+def donors_source_signature(store_dir=STORE_DIR):
+    """source_signature of the donor table"""
+    return source_signature('donors', DONORS_CSV, store_dir)
+
+
+def load_columns(table_dir, columns=None, mmap=True):
+    """
+    Raw column arrays of a compiled table: {name: (entry, array)}
+    Arrays are read-only memory maps unless mmap=False
+    """
+    manifest = read_manifest(table_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"No compiled table in {table_dir}")
+
+    wanted = None if columns is None else set(columns)
+    loaded = {}
+    for entry in manifest['columns']:
+        if wanted is not None and entry['name'] not in wanted:
+            continue
+        array = np.load(os.path.join(table_dir, entry['file']),
+                        mmap_mode='r' if mmap else None, allow_pickle=False)
+        loaded[entry['name']] = (entry, array)
+    return loaded
+
+
+def decode_bytes(values):
+    """Fixed-width bytes values (a bytes column, or some rows of one) -> str objects, '' -> NaN"""
+    decoded = np.char.decode(np.asarray(values), 'utf-8').astype(object)
+    decoded[decoded == ''] = np.nan
+    return decoded
+
+
+def load_table(table_dir, columns=None, mmap=True, raw_bytes=False):
+    """
+    Compiled table as a DataFrame; categoricals come back as pandas Categoricals
+    Bytes columns (ids, free text) are decoded to str unless raw_bytes=True:
+    then they stay fixed-width bytes arrays (memory-mapped, no O(n) decode)
+    and callers decode_bytes() just the rows they materialize.
+    """
+    data = {}
+    for name, (entry, array) in load_columns(table_dir, columns, mmap).items():
+        if entry['kind'] == 'category':
+            data[name] = pd.Categorical.from_codes(np.asarray(array), categories=entry['categories'])
+        elif entry['kind'] == 'bytes' and not raw_bytes:
+            data[name] = decode_bytes(array)
+        else:
+            data[name] = array
+    return pd.DataFrame(data, copy=False)
+
+
+def _load(name, csv_path, store_dir, columns, mmap, raw_bytes=False):
+    table_dir = os.path.join(store_dir, name)
+    if is_fresh(table_dir, csv_path):
+        return load_table(table_dir, columns, mmap, raw_bytes)
+    # Store missing or stale: parse the CSV (run `python donor_store.py` to rebuild)
+    df = pd.read_csv(csv_path, usecols=columns)
+    for column in df.columns:
+        if column in DATE_COLUMNS:
+            df[column] = pd.to_datetime(df[column], errors='coerce', format='mixed')
+    return df
+
+
+def load_donors(columns=None, store_dir=STORE_DIR, mmap=True, raw_bytes=False):
+    """
+    Donor table (hackathon_data.csv) from the columnar store
+    raw_bytes=True leaves user_id as stored bytes (see load_table); the CSV
+    fallback always returns strings
+    """
+    return _load('donors', DONORS_CSV, store_dir, columns, mmap, raw_bytes)
+
+
+def load_gamification(columns=None, store_dir=STORE_DIR, mmap=True):
+    """Gamification table (donor_gamification_data.csv) from the columnar store"""
+    return _load('gamification', GAMIFICATION_CSV, store_dir, columns, mmap)
+
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else STORE_DIR
+    print("🔄 Compiling donor CSVs into columnar store...")
+    for table, manifest in compile_store(target).items():
+        print(f"✅ {table}: {manifest['n_rows']:,} rows, {len(manifest['columns'])} columns")
+    print(f"📁 Store written to {target}")
@@ -0,0 +1,254 @@
+import hashlib
+import re
+
+import numpy as np
+import pandas as pd
+
+import donor_store
+from donor_store import DATE_COLUMNS
+
+# Low-cardinality strings -> small integer codes + category list
+CATEGORY_COLUMNS = [
+    'role', 'blood_group', 'gender', 'donor_type', 'eligibility_status', 'status',
+    'user_donation_active_status', 'bridge_id', 'bridge_gender', 'bridge_blood_group',
+    'inactive_trigger_comment', 'donated_earlier'
+]
+FLOAT32_COLUMNS = [
+    'latitude', 'longitude', 'quantity_required', 'donations_till_date', 'calls_to_donations_ratio'
+]
+INTEGER_COLUMNS = {
+    'cycle_of_donations': np.int16,
+    'total_calls': np.int32,
+    'frequency_in_days': np.int32
+}
+BOOL_COLUMNS = ['role_status', 'bridge_status', 'status_of_bridge']
+
+# user_id values look like '\x' + 64 hex characters (a 32-byte digest)
+_HEX_USER_ID = re.compile(r'^\\x([0-9a-fA-F]{64})$')
+ID_BYTES = 32
+# Byte value -> hex digit value, 16 = not a hex digit (for ids read as raw bytes)
+_HEX_VALUES = np.full(256, 16, dtype=np.uint8)
+_HEX_VALUES[np.frombuffer(b'0123456789abcdef', dtype=np.uint8)] = np.arange(16)
+_HEX_VALUES[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+
+
+def _codes_dtype(n_categories):
+    if n_categories < 2 ** 7:
+        return np.int8
+    if n_categories < 2 ** 15:
+        return np.int16
+    return np.int32
+
+
+def _factorize_bytes(values):
+    """pd.factorize for a fixed-width bytes column: (codes, decoded categories), b'' = missing (-1)"""
+    codes, uniques = pd.factorize(values)
+    decoded = donor_store.decode_bytes(uniques)
+    missing = pd.isna(decoded)
+    if missing.any():
+        remap = np.cumsum(~missing) - 1
+        remap[missing] = -1
+        codes = remap[codes]
+        decoded = decoded[~missing]
+    return codes, decoded.tolist()
+
+
+def encode_user_id(user_id):
+    """'\\x<64 hex>' -> 32 raw bytes; any other id is hashed (returns bytes, is_raw)"""
+    match = _HEX_USER_ID.match(str(user_id))
+    if match:
+        return bytes.fromhex(match.group(1)), True
+    return hashlib.sha256(str(user_id).encode('utf-8')).digest(), False
+
+
+class DonorTable:
+    """
+    Compact in-memory donor table
+    - categorical columns as int8/int16 codes (-1 = missing) + category lists
+    - user_id as 32-byte binary values, looked up through a sorted 64-bit prefix
+    - float32 coordinates and counts, small ints, pre-parsed datetime64 dates
+    Rows are addressed by position; to_dataframe() builds a pandas view when a
+    caller needs one.
+    """
+
+    def __init__(self, user_ids, columns, categories, raw_ids=None):
+        self.user_ids = user_ids          # np.ndarray of dtype V32
+        self.columns = columns            # name -> np.ndarray
+        self.categories = categories      # name -> list of category values
+        self.raw_ids = raw_ids or {}      # row -> original id when it was not hex (or None)
+        self._id_keys = None
+        self._id_order = None
+
+    @classmethod
+    def from_dataframe(cls, df):
+        """Build from a donor DataFrame (CSV or donor_store layout)"""
+        columns = {}
+        categories = {}
+
+        for name in df.columns:
+            if name == 'user_id':
+                continue
+            series = df[name]
+
+            if series.dtype.kind == 'S':
+                # Stored bytes (load_donors(raw_bytes=True)): decode the distinct values only
+                codes, uniques = _factorize_bytes(series.to_numpy())
+                columns[name] = codes.astype(_codes_dtype(len(uniques)))
+                categories[name] = uniques
+            elif name in CATEGORY_COLUMNS:
+                codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                columns[name] = codes.astype(_codes_dtype(len(uniques)))
+                categories[name] = uniques.tolist()
+            elif name in DATE_COLUMNS:
+                columns[name] = pd.to_datetime(series, errors='coerce', format='mixed').to_numpy(dtype='datetime64[s]')
+            elif name in FLOAT32_COLUMNS:
+                columns[name] = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float32)
+            elif name in INTEGER_COLUMNS and not series.isna().any():
+                columns[name] = series.to_numpy(dtype=INTEGER_COLUMNS[name])
+            elif name in BOOL_COLUMNS and not series.isna().any():
+                columns[name] = series.to_numpy(dtype=bool)
+            elif pd.api.types.is_numeric_dtype(series):
+                columns[name] = pd.to_numeric(series, errors='coerce').to_numpy(dtype=np.float32)
+            else:
+                codes, uniques = pd.factorize(series, use_na_sentinel=True)
+                columns[name] = codes.astype(_codes_dtype(len(uniques)))
+                categories[name] = uniques.tolist()
+
+        user_ids, raw_ids = cls._encode_user_ids(df['user_id'])
+        return cls(user_ids, columns, categories, raw_ids)
+
+    @classmethod
+    def from_store(cls, store_dir=donor_store.STORE_DIR):
+        """Build from the compiled donor store (CSV fallback when it is stale)"""
+        # user_id stays in its stored bytes form; ids are decoded per row on demand
+        return cls.from_dataframe(donor_store.load_donors(store_dir=store_dir, raw_bytes=True))
+
+    @staticmethod
+    def _encode_user_ids(values):
+        values = np.asarray(values)
+        if values.dtype.kind == 'S':
+            return DonorTable._encode_user_id_bytes(values)
+        encoded = []
+        raw_ids = {}
+        for row, user_id in enumerate(values):
+            if pd.isna(user_id):
+                encoded.append(bytes(ID_BYTES))
+                raw_ids[row] = None
+                continue
+            digest, is_raw = encode_user_id(user_id)
+            encoded.append(digest)
+            if not is_raw:
+                raw_ids[row] = user_id
+        return np.frombuffer(b''.join(encoded), dtype=f'V{ID_BYTES}').copy(), raw_ids
+
+    @staticmethod
+    def _encode_user_id_bytes(values):
+        """
+        _encode_user_ids for a stored bytes column, vectorized: rows holding
+        '\\x' + 64 hex characters are converted as a (rows x 66) byte matrix;
+        only the other rows are decoded and hashed one by one
+        """
+        n_rows, width = len(values), values.dtype.itemsize
+        chars = np.frombuffer(np.ascontiguousarray(values).tobytes(), dtype=np.uint8).reshape(n_rows, width)
+        hex_id = np.zeros(n_rows, dtype=bool)
+        if width >= 2 + 2 * ID_BYTES:
+            digits = chars[:, 2:2 + 2 * ID_BYTES]
+            hex_id = ((chars[:, 0] == ord('\\')) & (chars[:, 1] == ord('x'))
+                      & (_HEX_VALUES[digits] < 16).all(axis=1) & (chars[:, 2 + 2 * ID_BYTES:] == 0).all(axis=1))
+
+        raw = np.zeros((n_rows, ID_BYTES), dtype=np.uint8)
+        if hex_id.any():
+            nibbles = _HEX_VALUES[chars[hex_id, 2:2 + 2 * ID_BYTES]]
+            raw[hex_id] = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+        raw_ids = {}
+        for row in np.flatnonzero(~hex_id):
+            user_id = donor_store.decode_bytes(values[row:row + 1])[0]
+            if pd.isna(user_id):
+                raw_ids[int(row)] = None
+                continue
+            digest, is_raw = encode_user_id(user_id)
+            raw[row] = np.frombuffer(digest, dtype=np.uint8)
+            if not is_raw:
+                raw_ids[int(row)] = user_id
+        return raw.view(f'V{ID_BYTES}').ravel(), raw_ids
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def memory_usage(self):
+        """Resident bytes of the column arrays (category lists and raw ids excluded)"""
+        return self.user_ids.nbytes + sum(array.nbytes for array in self.columns.values())
+
+    def decode_user_ids(self, rows):
+        """Original user_id strings for the given row positions"""
+        rows = np.asarray(rows, dtype=np.int64)
+        raw = self.user_ids[rows].tobytes()
+        decoded = []
+        for i, row in enumerate(rows):
+            if int(row) in self.raw_ids:
+                decoded.append(self.raw_ids[int(row)])
+            else:
+                decoded.append('\\x' + raw[i * ID_BYTES:(i + 1) * ID_BYTES].hex())
+        return np.array(decoded, dtype=object)
+
+    def _build_id_index(self):
+        prefixes = np.frombuffer(self.user_ids.tobytes(), dtype=np.uint8).reshape(-1, ID_BYTES)[:, :8]
+        self._id_keys = prefixes.copy().view('>u8').ravel().astype(np.uint64)
+        self._id_order = np.argsort(self._id_keys, kind='stable')
+        self._id_keys = self._id_keys[self._id_order]
+
+    def row_of(self, user_id):
+        """Row position of a user_id (binary search on the 64-bit prefix), or None"""
+        if self._id_keys is None:
+            self._build_id_index()
+
+        digest, is_raw = encode_user_id(user_id)
+        key = np.frombuffer(digest[:8], dtype='>u8').astype(np.uint64)[0]
+        start = np.searchsorted(self._id_keys, key, side='left')
+        stop = np.searchsorted(self._id_keys, key, side='right')
+        for row in self._id_order[start:stop]:
+            if self.user_ids[row].tobytes() == digest and (is_raw or self.raw_ids.get(int(row)) == user_id):
+                return int(row)
+        return None
+
+    def codes(self, column):
+        return self.columns[column]
+
+    def mask(self, column, values):
+        """Boolean row mask for column in values (compares int codes, not strings)"""
+        if isinstance(values, str) or not hasattr(values, '__iter__'):
+            values = [values]
+        categories = self.categories[column]
+        lookup = np.zeros(len(categories) + 1, dtype=bool)  # last slot = missing
+        for value in values:
+            if value in categories:
+                lookup[categories.index(value)] = True
+        return lookup[self.columns[column]]
+
+    def value_counts(self, column):
+        """Counts per category (missing excluded), largest first"""
+        codes = self.columns[column]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.categories[column]))
+        return pd.Series(counts, index=self.categories[column], name='count').sort_values(
+            ascending=False, kind='stable'
+        )
+
+    def to_dataframe(self, columns=None, positions=None, decode_ids=True):
+        """
+        pandas view of the table: categoricals keep their int8/int16 codes,
+        numerics stay float32. The index is the row position, so
+        decode_user_ids(frame.index) recovers ids when decode_ids=False.
+        """
+        names = list(self.columns) if columns is None else [c for c in columns if c in self.columns]
+        rows = np.arange(len(self)) if positions is None else np.asarray(positions)
+
+        data = {}
+        if decode_ids and (columns is None or 'user_id' in columns):
+            data['user_id'] = self.decode_user_ids(rows)
+        for name in names:
+            values = self.columns[name] if positions is None else self.columns[name][rows]
+            if name in self.categories:
+                data[name] = pd.Categorical.from_codes(values, categories=self.categories[name])
+            else:
+                data[name] = values
+        return pd.DataFrame(data, index=pd.Index(rows), copy=False)
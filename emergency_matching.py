@@ -0,0 +1,155 @@
+# emergency_matching.py
+# Batch donor assignment for emergencies that arrive together. Ranking each
+# request on its own pages the same top donors for every request (three O-
+# emergencies in one city would all alert the same ten O- donors); here the
+# requests of a batch share one candidate pool and every donor is alerted at
+# most once.
+import asyncio
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+# Ranked candidates per request considered by the assignment: enough for
+# every request of the batch to take its slots (see candidate_depth), within bounds
+BATCH_CANDIDATES = 50
+MAX_BATCH_CANDIDATES = 1000
+# Emergencies arriving within this window are matched together
+BATCH_WINDOW_SECONDS = 0.25
+# Request weight by urgency (multiplies the donors' composite scores)
+URGENCY_WEIGHTS = {'low': 0.8, 'medium': 1.0, 'high': 1.2, 'critical': 1.5}
+
+
+def candidate_depth(n_requests, slots):
+    """
+    Candidates to keep per request: a batch takes at most slots * n_requests
+    donors, so a request's top slots * n_requests candidates always leave it
+    `slots` free ones (capped at MAX_BATCH_CANDIDATES)
+    """
+    return min(MAX_BATCH_CANDIDATES, max(BATCH_CANDIDATES, slots * n_requests))
+
+
+def _ranked_candidates(codes, weights):
+    """A request's distinct candidate codes by descending weight (a donor listed twice keeps its best weight)"""
+    weights = np.asarray(weights, dtype=float)
+    order = np.argsort(-weights, kind='stable')
+    codes, weights = codes[order], weights[order]
+    _, first = np.unique(codes, return_index=True)
+    first = np.sort(first)
+    first = first[weights[first] > 0]
+    return codes[first], weights[first]
+
+
+def _match_round(candidates, free, requests):
+    """
+    One assignment round: (request, donor code) pairs of a maximum-weight
+    matching between the requests and their free candidates
+    In an optimal matching no request needs more than len(requests) of its
+    best free candidates (the other requests take at most len(requests) - 1
+    of them), so only those enter the sparse cost matrix. Every request also
+    gets a private "no donor" column, so a full matching always exists.
+    """
+    depth = len(requests)
+    rows, codes, weights = [], [], []
+    for i, r in enumerate(requests):
+        request_codes, request_weights = candidates[r]
+        open_ = free[request_codes]
+        top_codes, top_weights = request_codes[open_][:depth], request_weights[open_][:depth]
+        rows.append(np.full(len(top_codes), i))
+        codes.append(top_codes)
+        weights.append(top_weights)
+    rows, codes, weights = np.concatenate(rows), np.concatenate(codes), np.concatenate(weights)
+    if not len(codes):
+        return []
+
+    cols, col_codes = pd.factorize(codes)
+    # Minimum cost = maximum weight; "no donor" costs as much as a zero-weight match
+    base = weights.max() + 1
+    cost = csr_matrix(
+        (np.concatenate([base - weights, np.full(depth, base)]),
+         (np.concatenate([rows, np.arange(depth)]), np.concatenate([cols, len(col_codes) + np.arange(depth)]))),
+        shape=(depth, len(col_codes) + depth)
+    )
+    matched_rows, matched_cols = min_weight_full_bipartite_matching(cost)
+    return [(requests[i], col_codes[c]) for i, c in zip(matched_rows, matched_cols) if c < len(col_codes)]
+
+
+def assign_donors(candidate_ids, candidate_weights, slots):
+    """
+    Assign donors to requests, each donor to at most one request
+    candidate_ids[r] / candidate_weights[r]: request r's candidate donors and
+    their (positive) match weights. Assignment runs in rounds: every round
+    gives each request that still has free candidates one more donor, chosen
+    by an optimal assignment over the whole batch (a sparse bipartite
+    matching, see _match_round), so scarce donors are spread across requests
+    before any request gets its next one. Returns, per request, up to `slots`
+    donor ids by descending weight.
+    """
+    n_requests = len(candidate_ids)
+    assigned = [[] for _ in range(n_requests)]
+    lengths = [len(ids) for ids in candidate_ids]
+    if sum(lengths) == 0:
+        return assigned
+    donor_codes, donors = pd.factorize(np.concatenate([np.asarray(ids, dtype=object) for ids in candidate_ids]))
+    candidates = [_ranked_candidates(codes, weights)
+                  for codes, weights in zip(np.split(donor_codes, np.cumsum(lengths)[:-1]), candidate_weights)]
+
+    free = np.ones(len(donors), dtype=bool)
+    active = [r for r in range(n_requests) if len(candidates[r][0])]
+    for _ in range(slots):
+        if not active:
+            break
+        matches = _match_round(candidates, free, active)
+        for r, code in matches:
+            assigned[r].append(code)
+            free[code] = False
+        # Requests left without a match have no free candidates anymore
+        matched = {r for r, _ in matches}
+        active = [r for r in active if r in matched]
+
+    # Matches come in descending weight within a request only per round; sort by weight
+    results = []
+    for r, codes in enumerate(assigned):
+        weight = dict(zip(*candidates[r]))
+        results.append([donors[c] for c in sorted(codes, key=lambda c: -weight[c])])
+    return results
+
+
+class EmergencyBatcher:
+    """
+    Collects emergency messages for window_seconds, then matches them in one
+    EmergencySystem.prepare_batch_alerts call (in a worker thread)
+    submit() resolves to the message's result once its batch is matched.
+    """
+
+    def __init__(self, emergency_system, window_seconds=BATCH_WINDOW_SECONDS):
+        self.emergency_system = emergency_system
+        self.window_seconds = window_seconds
+        self.pending = []
+        self.batches_matched = 0
+
+    async def submit(self, message, urgency='high'):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((message, urgency, future))
+        if len(self.pending) == 1:
+            loop.create_task(self._flush_after_window())
+        return await future
+
+    async def _flush_after_window(self):
+        await asyncio.sleep(self.window_seconds)
+        batch, self.pending = self.pending, []
+        messages = [message for message, _, _ in batch]
+        urgencies = [urgency for _, urgency, _ in batch]
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(
+                None, self.emergency_system.prepare_batch_alerts, messages, urgencies
+            )
+        except Exception as e:
+            results = [{'status': 'error', 'message': str(e)}] * len(batch)
+        self.batches_matched += 1
+        for (_, _, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -1,3 +1,41 @@
+import asyncio
+
+from blood_compatibility import BLOOD_COMPATIBILITY, normalize_blood_group
+from emergency_matching import URGENCY_WEIGHTS, assign_donors, candidate_depth
+from pincode_gazetteer import lookup_pincode
+from pipeline_metrics import EMERGENCY_METRICS
+
+# Search radii tried in order until enough donors are found (None = no limit)
+SEARCH_RADII_KM = [50, 100, None]
+MAX_ALERTS = 10
+
+DEFAULT_PINCODE = '500001'
+# City centres of the demo data (synthetic donors cluster around them)
+PINCODE_COORDINATES = {
+    '500001': (17.3850, 78.4867),  # Hyderabad
+    '560001': (12.9716, 77.5946),  # Bangalore
+    '400001': (19.0760, 72.8777),  # Mumbai
+    '110001': (28.6139, 77.2090),  # Delhi
+}
+
+
+def parse_help_message(message):
+    """
+    "HELP O+ 560001" -> (blood group as sent, pincode), or None when the
+    message is not a HELP request. Two-word spellings ("HELP O POS 560001",
+    "HELP AB Negative") are accepted; the pincode defaults to DEFAULT_PINCODE.
+    """
+    parts = message.strip().upper().split()
+    if len(parts) < 2 or parts[0] != "HELP":
+        return None
+    group_words = 1
+    if len(parts) > 2 and normalize_blood_group(' '.join(parts[1:3])) in BLOOD_COMPATIBILITY:
+        group_words = 2
+    blood_group = ' '.join(parts[1:1 + group_words])
+    rest = parts[1 + group_words:]
+    pincode = rest[0] if rest else DEFAULT_PINCODE  # Default Hyderabad
+    return blood_group, pincode
+
 
 class EmergencySystem:
     """
@@ -5,60 +43,193 @@ class EmergencySystem:
     Handles SMS/WhatsApp alerts and donor ranking
     """
 
-    def __init__(self, ranking_system):
+    def __init__(self, ranking_system, dispatcher=None, metrics=None):
         self.ranking_system = ranking_system
+        # Optional AlertDispatcher; without one alerts are only built, not sent
+        self.dispatcher = dispatcher
+        # Per-stage latencies (pipeline_metrics); ranking and dispatch stages
+        # are recorded by the ranking system and the dispatcher
+        self.metrics = metrics or EMERGENCY_METRICS
 
     def process_emergency_request(self, message):
         """
         Process emergency SMS: "HELP O+ 560001"
         Returns ranked donor list and alert messages
+        (plus delivery receipts when a dispatcher is configured)
         """
+        result = self.prepare_emergency_alerts(message)
+        if self.dispatcher is None or not result or result['status'] != 'success':
+            return result
+
+        try:
+            receipts = self.dispatcher.dispatch_sync(result['top_donors'])
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+        return self.attach_receipts(result, receipts)
+
+    async def process_emergency_request_async(self, message):
+        """process_emergency_request for callers already inside an event loop"""
+        # Ranking and model inference block: keep them off the event loop
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, self.prepare_emergency_alerts, message)
+        if self.dispatcher is None or not result or result['status'] != 'success':
+            return result
+
         try:
-            parts = message.strip().upper().split()
-            if len(parts) >= 2 and parts[0] == "HELP":
-                blood_group = parts[1]
-                pincode = parts[2] if len(parts) > 2 else "500001"  # Default Hyderabad
+            receipts = await self.dispatcher.dispatch(result['top_donors'])
+        except Exception as e:
+            return {'status': 'error', 'message': str(e)}
+        return self.attach_receipts(result, receipts)
 
-                # Convert pincode to rough coordinates (simplified)
-                lat, lon = self.pincode_to_coordinates(pincode)
+    def attach_receipts(self, result, receipts):
+        """Fold delivery receipts into an emergency result"""
+        delivered = sum(1 for r in receipts if r['status'] == 'delivered')
+        result['alerts_sent'] = delivered
+        result['alerts_failed'] = len(receipts) - delivered
+        result['delivery_receipts'] = receipts
+        return result
 
-                emergency_request = {
-                    'blood_group': blood_group,
-                    'latitude': lat,
-                    'longitude': lon,
-                    'urgency': 'high',
-                    'quantity': '1 unit'
-                }
+    def parse_emergency_message(self, message):
+        """
+        "HELP O+ 560001" -> (blood group as sent, pincode, emergency request),
+        or None when the message is not an emergency request
+        """
+        with self.metrics.time('parse'):
+            parsed = parse_help_message(message)
+        if parsed is None:
+            return None
+        blood_group, pincode = parsed
 
-                # Get ranked donors
-                donors = self.ranking_system.get_compatible_donors(blood_group)
+        # Offline gazetteer: the pincode itself, else its district centroid
+        with self.metrics.time('geocode'):
+            lat, lon, precision = self.locate_pincode(pincode)
+
+        emergency_request = {
+            'blood_group': blood_group,
+            'latitude': lat,
+            'longitude': lon,
+            'location_precision': precision,
+            'urgency': 'high',
+            'quantity': '1 unit'
+        }
+
+        # Donor table uses 'O Positive' style names
+        emergency_request['blood_group'] = normalize_blood_group(blood_group)
+        return blood_group, pincode, emergency_request
+
+    def find_candidates(self, emergency_request, min_donors=MAX_ALERTS):
+        """
+        Ranked donors near the emergency, widening the radius until there are
+        at least min_donors (or no limit is left): (donors, radius_km)
+        """
+        for radius_km in SEARCH_RADII_KM:
+            donors = self.ranking_system.rank_donors_vectorized(
+                emergency_request, max_radius_km=radius_km
+            )
+            if len(donors) >= min_donors:
+                break
+        return donors, radius_km
+
+    def build_result(self, blood_group, pincode, donors, radius_km, donor_ids, location_precision=None):
+        """Alert messages for the chosen donors, in priority order"""
+        with self.metrics.time('alert_build'):
+            alerts = []
+            for i, donor_id in enumerate(donor_ids):
+                message = f"🚨 URGENT: {blood_group} blood needed near {pincode}. Can you help? Reply YES/NO"
+                alerts.append({
+                    'donor_id': donor_id,
+                    'message': message,
+                    'priority': i + 1
+                })
+
+        return {
+            'status': 'success',
+            'compatible_donors': len(donors),
+            'search_radius_km': radius_km,
+            'location_precision': location_precision,
+            'alerts_sent': len(alerts),
+            'top_donors': alerts
+        }
+
+    def prepare_emergency_alerts(self, message):
+        """Parse the SMS, rank donors and build (but do not send) the alert messages"""
+        with self.metrics.time('end_to_end'):
+            result = self._prepare_emergency_alerts(message)
+        self.metrics.count_outcome(result['status'] if result else 'ignored')
+        return result
+
+    def _prepare_emergency_alerts(self, message):
+        try:
+            parsed = self.parse_emergency_message(message)
+            if parsed is not None:
+                blood_group, pincode, emergency_request = parsed
+
+                # Rank donors near the emergency, widening the radius if too few
+                donors, radius_km = self.find_candidates(emergency_request)
 
                 # Create alert messages
-                alerts = []
-                for i, (_, donor) in enumerate(donors.head(10).iterrows()):
-                    message = f"🚨 URGENT: {blood_group} blood needed near {pincode}. Can you help? Reply YES/NO"
-                    alerts.append({
-                        'donor_id': donor['user_id'],
-                        'message': message,
-                        'priority': i + 1
-                    })
-
-                return {
-                    'status': 'success',
-                    'compatible_donors': len(donors),
-                    'alerts_sent': len(alerts),
-                    'top_donors': alerts
-                }
+                return self.build_result(blood_group, pincode, donors, radius_km,
+                                         donors['user_id'].head(MAX_ALERTS),
+                                         emergency_request['location_precision'])
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
 
+    def prepare_batch_alerts(self, messages, urgencies=None):
+        """
+        prepare_emergency_alerts for emergencies that arrived together: donors
+        are assigned across the whole batch (see emergency_matching), so each
+        donor is alerted for at most one request. urgencies (one per message,
+        default 'high') weight the requests against each other.
+        Returns one result per message.
+        """
+        urgencies = urgencies or ['high'] * len(messages)
+        results = [None] * len(messages)
+        ranked = []
+        candidates = {}  # identical requests are ranked once
+        # Every request of the batch needs its own MAX_ALERTS donors from the shared pool
+        min_donors = candidate_depth(len(messages), MAX_ALERTS)
+        for i, message in enumerate(messages):
+            try:
+                parsed = self.parse_emergency_message(message)
+                if parsed is not None:
+                    blood_group, pincode, emergency_request = parsed
+                    key = (emergency_request['blood_group'], pincode)
+                    if key not in candidates:
+                        candidates[key] = self.find_candidates(emergency_request, min_donors)
+                    donors, radius_km = candidates[key]
+                    ranked.append((i, blood_group, pincode, donors, radius_km,
+                                   emergency_request['location_precision']))
+            except Exception as e:
+                results[i] = {'status': 'error', 'message': str(e)}
+
+        depth = candidate_depth(len(ranked), MAX_ALERTS)
+        with self.metrics.time('batch_assignment'):
+            assignments = assign_donors(
+                [donors['user_id'].to_numpy()[:depth] for _, _, _, donors, _, _ in ranked],
+                [donors['composite_score'].to_numpy(dtype=float)[:depth]
+                 * URGENCY_WEIGHTS.get(str(urgencies[i]).lower(), 1.0) for i, _, _, donors, _, _ in ranked],
+                MAX_ALERTS
+            )
+        for (i, blood_group, pincode, donors, radius_km, precision), donor_ids in zip(ranked, assignments):
+            results[i] = self.build_result(blood_group, pincode, donors, radius_km, donor_ids, precision)
+            results[i]['batch_size'] = len(messages)
+        for result in results:
+            self.metrics.count_outcome(result['status'] if result else 'ignored')
+        return results
+
+    def locate_pincode(self, pincode):
+        """
+        (latitude, longitude, precision) from the offline gazetteer; precision
+        is 'pincode', 'district' (3-digit prefix centroid) or 'default' when
+        nothing matches (then the default pincode's location is used)
+        """
+        match = lookup_pincode(pincode)
+        if match is None:
+            match = lookup_pincode(DEFAULT_PINCODE) or (*PINCODE_COORDINATES[DEFAULT_PINCODE], None, None)
+            return match[0], match[1], 'default'
+        return match[0], match[1], match[2]
+
     def pincode_to_coordinates(self, pincode):
         """Convert pincode to approximate coordinates"""
-        # Simplified mapping - in production, use a proper geocoding API
-        pincode_map = {
-            '500001': (17.3850, 78.4867),  # Hyderabad
-            '560001': (12.9716, 77.5946),  # Bangalore
-            '400001': (19.0760, 72.8777),  # Mumbai
-            '110001': (28.6139, 77.2090),  # Delhi
-        }
-        return pincode_map.get(pincode, (17.3850, 78.4867))  # Default to Hyderabad
+        lat, lon, _ = self.locate_pincode(pincode)
+        return lat, lon
@@ -0,0 +1,168 @@
+# feature_cache.py
+# Persisted ML feature matrix: `python feature_cache.py` stores the
+# now-independent part of the model features (counts, label encodings, the
+# parsed registration / last donation dates and the training target) in
+# donor_store/features. Refreshes recompute only donors whose source columns
+# changed; the day-relative features are derived from the stored dates for
+# whatever `now` is asked for, so nothing is re-parsed between runs.
+import hashlib
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from donor_store import STORE_DIR, donors_source_signature, load_donors, load_table, read_manifest, write_table
+from ml_features import (
+    FEATURE_SOURCE_COLUMNS, LABEL_ENCODERS_PATH, ML_FEATURE_COLUMNS, TARGET_SOURCE_COLUMNS,
+    add_day_features, donation_target, load_label_encoders, prepare_ml_data, select_features
+)
+
+FEATURES_TABLE = 'features'
+
+# Feature columns that do not depend on `now`
+STATIC_FEATURE_COLUMNS = [
+    'donations_till_date', 'total_calls', 'calls_to_donations_ratio',
+    'frequency_in_days', 'cycle_of_donations',
+    'blood_group_encoded', 'gender_encoded', 'role_encoded', 'donor_type_encoded'
+]
+DATE_SOURCE_COLUMNS = ['registration_date', 'last_donation_date']
+
+# Hashed per donor row to find the rows that changed since the last refresh
+HASHED_COLUMNS = list(dict.fromkeys(FEATURE_SOURCE_COLUMNS + TARGET_SOURCE_COLUMNS))
+
+
+def encoders_version(path=LABEL_ENCODERS_PATH):
+    """Short content hash of label_encoders.pkl; new encoders invalidate the cache"""
+    with open(path, 'rb') as f:
+        return 'le_' + hashlib.sha1(f.read()).hexdigest()[:10]
+
+
+def _row_keys(user_ids):
+    """user_id plus its occurrence number, so duplicated ids still pair up row by row"""
+    ids = pd.Series(user_ids, dtype=object).fillna('')
+    return ids + '#' + ids.groupby(ids).cumcount().astype(str)
+
+
+def _compute_rows(donors, label_encoders):
+    """Cached columns for a slice of the donor table (the full preprocessing pass)"""
+    df_ml = prepare_ml_data(donors)
+    X = select_features(df_ml, label_encoders)
+    rows = pd.DataFrame({col: X[col].to_numpy(dtype=float) for col in STATIC_FEATURE_COLUMNS})
+    for col in DATE_SOURCE_COLUMNS:
+        rows[col] = pd.to_datetime(donors[col], errors='coerce', format='mixed').to_numpy(dtype='datetime64[ns]')
+    rows['will_donate_again'] = donation_target(donors)
+    return rows
+
+
+def _row_hashes(df):
+    """
+    Hash of each row's source values. Categoricals from the store hash like
+    the CSV strings they came from; datetimes are hashed at one unit, since the
+    CSV fallback loads datetime64[us] and the store datetime64[ns]
+    """
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].astype('datetime64[ns]')
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def refresh_feature_cache(store_dir=STORE_DIR, label_encoders=None, force=False):
+    """
+    Bring donor_store/features up to date with the donor table
+    - donor data and encoders unchanged: nothing to do
+    - otherwise rows are matched to the cache by user_id and a hash of their
+      source columns; only new or changed donors go through prepare_ml_data
+    - new label encoders (or force=True) rebuild every row
+    Returns the table manifest.
+    """
+    started = time.perf_counter()
+    table_dir = os.path.join(store_dir, FEATURES_TABLE)
+    version = encoders_version()
+    source_mtime, source_size = donors_source_signature(store_dir)
+
+    manifest = read_manifest(table_dir)
+    if manifest is not None and manifest.get('encoders_version') != version:
+        manifest = None
+    if manifest is not None and not force and (
+            (manifest.get('donors_source_mtime'), manifest.get('donors_source_size')) == (source_mtime, source_size)):
+        return dict(manifest, rows_recomputed=0)
+
+    donors = load_donors(columns=['user_id'] + HASHED_COLUMNS, store_dir=store_dir)
+    keys = _row_keys(donors['user_id'].to_numpy())
+    row_hash = _row_hashes(donors[HASHED_COLUMNS])
+
+    reuse = np.zeros(len(donors), dtype=bool)
+    cached_pos = np.full(len(donors), -1)
+    cached = None
+    if manifest is not None and not force:
+        cached = load_table(table_dir, mmap=False)
+        positions = pd.Series(np.arange(len(cached)), index=_row_keys(cached['user_id'].to_numpy()))
+        cached_pos = positions.reindex(keys).fillna(-1).to_numpy(dtype=np.int64)
+        found = cached_pos >= 0
+        reuse[found] = cached['row_hash'].to_numpy()[cached_pos[found]] == row_hash[found]
+
+    recompute = np.flatnonzero(~reuse)
+    table = pd.DataFrame({'user_id': donors['user_id'].to_numpy(dtype=object), 'row_hash': row_hash})
+    columns = STATIC_FEATURE_COLUMNS + DATE_SOURCE_COLUMNS + ['will_donate_again']
+    for col in columns:
+        if reuse.any():
+            table[col] = cached[col].to_numpy()[np.where(reuse, cached_pos, cached_pos[reuse][0])]
+        else:
+            table[col] = np.zeros(len(donors), dtype='datetime64[ns]' if col in DATE_SOURCE_COLUMNS else float)
+    if len(recompute):
+        rows = _compute_rows(donors.iloc[recompute], label_encoders or load_label_encoders())
+        for col in columns:
+            values = table[col].to_numpy().copy()
+            values[recompute] = rows[col].to_numpy()
+            table[col] = values
+    table['will_donate_again'] = table['will_donate_again'].astype(int)
+
+    return write_table(
+        table, table_dir,
+        encoders_version=version,
+        donors_source_mtime=source_mtime,
+        donors_source_size=source_size,
+        refreshed_at=datetime.now().isoformat(timespec='seconds'),
+        rows_recomputed=int(len(recompute)),
+        seconds=round(time.perf_counter() - started, 3)
+    )
+
+
+def load_feature_matrix(now=None, store_dir=STORE_DIR, refresh=True):
+    """
+    Model features for every donor row (donor table order): user_id, the 12
+    model_info.json features_used in training order and will_donate_again.
+    Day-relative features are derived from the cached dates for `now`, exactly
+    as prepare_ml_data would. With refresh=True the cache is brought up to
+    date first (see refresh_feature_cache).
+    """
+    now = now or datetime.now()
+    table_dir = os.path.join(store_dir, FEATURES_TABLE)
+    if refresh:
+        refresh_feature_cache(store_dir)
+    cached = load_table(table_dir)
+
+    df_ml = pd.DataFrame({'donations_till_date': cached['donations_till_date'].to_numpy()})
+    add_day_features(df_ml, pd.Series(cached['registration_date'].to_numpy()),
+                     pd.Series(cached['last_donation_date'].to_numpy()), now)
+
+    features = pd.DataFrame({'user_id': cached['user_id'].to_numpy()})
+    for col in ML_FEATURE_COLUMNS:
+        source = df_ml if col in df_ml.columns else cached
+        features[col] = source[col].to_numpy(dtype=float)
+    features[ML_FEATURE_COLUMNS] = features[ML_FEATURE_COLUMNS].fillna(0)
+    features['will_donate_again'] = cached['will_donate_again'].to_numpy()
+    return features
+
+
+if __name__ == "__main__":
+    force = '--full' in sys.argv[1:]
+    print("🔄 Refreshing ML feature cache...")
+    manifest = refresh_feature_cache(force=force)
+    print(f"✅ {manifest['n_rows']:,} donors, {manifest.get('rows_recomputed', 0):,} recomputed "
+          f"(last refresh {manifest['refreshed_at']})")
+    print(f"📁 Cache at {os.path.join(STORE_DIR, FEATURES_TABLE)}")
@@ -0,0 +1,207 @@
+# kpi_cubes.py
+# Materialized KPI aggregates for the management dashboard. Two small cubes
+# are computed once per data version and stored in donor_store/kpi_cubes.json:
+# - donors: count and donations per (blood group, role, status, registration month)
+# - scores: gamification rows per (blood group, donations, score, badge count)
+# Every overview / gamification chart is a roll-up of one cube, so page loads
+# cost the same for 7k or 1M donors; donor changes are applied as deltas.
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from donor_store import (
+    GAMIFICATION_CSV, STORE_DIR, donors_source_signature, load_donors, load_gamification, source_signature
+)
+
+KPI_CUBES_FILE = 'kpi_cubes.json'
+KPI_FORMAT_VERSION = 1
+
+DONOR_DIMENSIONS = ['blood_group', 'role', 'user_donation_active_status', 'registration_month']
+SCORE_DIMENSIONS = ['blood_group', 'donations', 'score', 'badge_count']
+DONOR_CUBE_COLUMNS = ['blood_group', 'role', 'user_donation_active_status', 'registration_date', 'donations_till_date']
+SCORE_CUBE_COLUMNS = ['blood_group', 'donations', 'score', 'badge_count']
+
+SCORE_BIN_WIDTH = 100
+
+
+def data_version(store_dir=STORE_DIR):
+    """Source signatures of the donor and gamification tables the cubes summarize"""
+    return [list(donors_source_signature(store_dir)),
+            list(source_signature('gamification', GAMIFICATION_CSV, store_dir))]
+
+
+def _dimension(values):
+    """Cube key column: plain Python objects, missing values as None"""
+    values = pd.Series(values, dtype=object)
+    return values.where(values.notna(), None)
+
+
+def _donor_rows(df):
+    """Donor rows -> one cube contribution per row"""
+    registration = pd.to_datetime(df['registration_date'], errors='coerce', format='mixed')
+    return pd.DataFrame({
+        'blood_group': _dimension(df['blood_group'].to_numpy()),
+        'role': _dimension(df['role'].to_numpy()),
+        'user_donation_active_status': _dimension(df['user_donation_active_status'].to_numpy()),
+        'registration_month': _dimension(registration.dt.strftime('%Y-%m').to_numpy()),
+        'count': 1,
+        'donations': pd.to_numeric(df['donations_till_date'], errors='coerce').fillna(0).to_numpy()
+    })
+
+
+def _score_rows(df):
+    """Gamification rows -> one cube contribution per row"""
+    return pd.DataFrame({
+        'blood_group': _dimension(df['blood_group'].to_numpy()),
+        'donations': pd.to_numeric(df['donations'], errors='coerce').fillna(0).to_numpy(),
+        'score': pd.to_numeric(df['score'], errors='coerce').fillna(0).to_numpy(),
+        'badge_count': pd.to_numeric(df['badge_count'], errors='coerce').fillna(0).to_numpy(dtype=int),
+        'count': 1
+    })
+
+
+def _aggregate(rows, dimensions):
+    """Sum measures per dimension combination; drop emptied cells"""
+    measures = [c for c in rows.columns if c not in dimensions]
+    cube = rows.groupby(dimensions, dropna=False, sort=False)[measures].sum().reset_index()
+    return cube[cube['count'] != 0].reset_index(drop=True)
+
+
+def _apply(cube, before, after, dimensions):
+    """cube - before + after (each a frame of cube rows)"""
+    parts = [cube]
+    if before is not None and len(before):
+        removed = before.copy()
+        measures = [c for c in removed.columns if c not in dimensions]
+        removed[measures] = -removed[measures]
+        parts.append(removed)
+    if after is not None and len(after):
+        parts.append(after)
+    return _aggregate(pd.concat(parts, ignore_index=True), dimensions)
+
+
+class KpiCubes:
+    """
+    Pre-aggregated donor and gamification KPIs
+    Read methods roll a cube up (cost grows with the number of distinct
+    dimension combinations, not with donors); apply_*_changes() keep the
+    cubes current without a rescan.
+    """
+
+    def __init__(self, donors, scores, version=None):
+        self.donors = donors
+        self.scores = scores
+        self.version = version
+
+    @classmethod
+    def from_frames(cls, df_donors, df_gamification, version=None):
+        return cls(_aggregate(_donor_rows(df_donors), DONOR_DIMENSIONS),
+                   _aggregate(_score_rows(df_gamification), SCORE_DIMENSIONS), version)
+
+    def apply_donor_changes(self, before=None, after=None):
+        """
+        Update the donor cube for changed donors: before = their old rows
+        (None for new donors), after = their new rows (None for removed ones)
+        """
+        self.donors = _apply(self.donors, None if before is None else _donor_rows(before),
+                             None if after is None else _donor_rows(after), DONOR_DIMENSIONS)
+        self.version = None
+
+    def apply_score_changes(self, before=None, after=None):
+        """Update the score cube for changed gamification rows (see apply_donor_changes)"""
+        self.scores = _apply(self.scores, None if before is None else _score_rows(before),
+                             None if after is None else _score_rows(after), SCORE_DIMENSIONS)
+        self.version = None
+
+    # Overview KPIs
+
+    def total_donors(self):
+        return int(self.donors['count'].sum())
+
+    def active_donors(self):
+        return int(self.donors.loc[self.donors['user_donation_active_status'] == 'Active', 'count'].sum())
+
+    def total_donations(self):
+        return float(self.donors['donations'].sum())
+
+    def average_score(self):
+        count = self.scores['count'].sum()
+        return float((self.scores['score'] * self.scores['count']).sum() / count) if count else 0.0
+
+    def counts_by(self, dimension):
+        """Donors per value of a donor dimension, largest first (missing values excluded, like value_counts)"""
+        cube = self.donors[self.donors[dimension].notna()]
+        return cube.groupby(dimension, sort=False)['count'].sum().sort_values(ascending=False, kind='stable')
+
+    def monthly_registrations(self):
+        """New registrations per 'YYYY-MM' month, in month order"""
+        cube = self.donors[self.donors['registration_month'].notna()]
+        return cube.groupby('registration_month')['count'].sum().sort_index()
+
+    # Gamification KPIs
+
+    def badge_distribution(self):
+        """Donors per badge count"""
+        return self.scores.groupby('badge_count')['count'].sum().sort_index()
+
+    def score_histogram(self, bin_width=SCORE_BIN_WIDTH):
+        """Donors per score bin (indexed by the bin's lower edge)"""
+        bins = (np.floor(self.scores['score'] / bin_width) * bin_width).astype(int)
+        return self.scores['count'].groupby(bins).sum().sort_index()
+
+    def donations_vs_score(self):
+        """(donations, score, blood_group, count) points for a bubble chart"""
+        return self.scores.groupby(['donations', 'score', 'blood_group'], dropna=False)['count'].sum().reset_index()
+
+    def top_scores(self, k=10):
+        """The k best gamification rows (score, donations, badge_count, blood_group)"""
+        top = self.scores.sort_values('score', ascending=False, kind='stable')
+        top = top[top['count'].cumsum().shift(fill_value=0) < k]
+        rows = top.loc[top.index.repeat(top['count'])].head(k)
+        return rows[['score', 'donations', 'badge_count', 'blood_group']].reset_index(drop=True)
+
+    def to_dict(self):
+        return {
+            'format': KPI_FORMAT_VERSION,
+            'version': self.version,
+            'donors': self.donors.astype(object).where(self.donors.notna(), None).to_dict('list'),
+            'scores': self.scores.astype(object).where(self.scores.notna(), None).to_dict('list')
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        donors = pd.DataFrame(data['donors'], columns=DONOR_DIMENSIONS + ['count', 'donations'])
+        scores = pd.DataFrame(data['scores'], columns=SCORE_DIMENSIONS + ['count'])
+        for cube, measures in ((donors, ['count', 'donations']), (scores, ['donations', 'score', 'badge_count', 'count'])):
+            for column in measures:
+                cube[column] = pd.to_numeric(cube[column])
+        return cls(donors, scores, data.get('version'))
+
+
+def build_kpi_cubes(store_dir=STORE_DIR):
+    """Scan the donor and gamification tables once and save the cubes"""
+    version = data_version(store_dir)
+    cubes = KpiCubes.from_frames(load_donors(columns=DONOR_CUBE_COLUMNS, store_dir=store_dir),
+                                 load_gamification(columns=SCORE_CUBE_COLUMNS, store_dir=store_dir), version)
+    save_kpi_cubes(cubes, store_dir)
+    return cubes
+
+
+def save_kpi_cubes(cubes, store_dir=STORE_DIR):
+    os.makedirs(store_dir, exist_ok=True)
+    with open(os.path.join(store_dir, KPI_CUBES_FILE), 'w') as f:
+        json.dump(cubes.to_dict(), f)
+
+
+def load_kpi_cubes(store_dir=STORE_DIR):
+    """Saved cubes when they match the current data version, else rebuilt from the tables"""
+    try:
+        with open(os.path.join(store_dir, KPI_CUBES_FILE), 'r') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = None
+    if data and data.get('format') == KPI_FORMAT_VERSION and data.get('version') == data_version(store_dir):
+        return KpiCubes.from_dict(data)
+    return build_kpi_cubes(store_dir)
@@ -0,0 +1,257 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Leaderboard "areas" are lat/lon grid cells of this size (~11 km at Indian latitudes)
+AREA_CELL_DEG = 0.1
+LEADERBOARD_DIMENSIONS = ('blood_group', 'role', 'area')
+
+
+def area_key(latitude, longitude, cell_deg=AREA_CELL_DEG):
+    """Grid cell label for a location, e.g. '17.3,78.4' (None when unknown)"""
+    if latitude is None or longitude is None or pd.isna(latitude) or pd.isna(longitude):
+        return None
+    return f"{math.floor(latitude / cell_deg) * cell_deg:.1f},{math.floor(longitude / cell_deg) * cell_deg:.1f}"
+
+
+def area_keys(latitudes, longitudes, cell_deg=AREA_CELL_DEG):
+    """Vectorized area_key"""
+    lat = np.floor(np.asarray(latitudes, dtype=float) / cell_deg) * cell_deg
+    lon = np.floor(np.asarray(longitudes, dtype=float) / cell_deg) * cell_deg
+    keys = np.array([f"{a:.1f},{b:.1f}" for a, b in zip(lat, lon)], dtype=object)
+    keys[np.isnan(lat) | np.isnan(lon)] = None
+    return keys
+
+
+class Leaderboard:
+    """
+    Order-statistic leaderboard over integer scores
+    A Fenwick tree counts donors per score, so update(), rank() and each step
+    of top() cost O(log max_score). Ties share a rank (1 + donors with a
+    strictly higher score); within a score, top() lists donors in the order
+    they reached it. Scores are floored to ints; NaN scores are not ranked.
+    """
+
+    def __init__(self, max_score=1024):
+        self.size = 1
+        while self.size <= max_score:
+            self.size *= 2
+        self.tree = [0] * (self.size + 1)
+        self.scores = {}      # donor_id -> score key
+        self.buckets = {}     # score key -> {donor_id: None}, insertion ordered
+
+    @classmethod
+    def from_scores(cls, donor_ids, scores):
+        """Bulk build in O(n + max_score)"""
+        board = cls()
+        for donor_id, score in zip(donor_ids, scores):
+            if score is None or pd.isna(score) or donor_id in board.scores:
+                continue
+            key = max(0, int(score))
+            board.scores[donor_id] = key
+            board.buckets.setdefault(key, {})[donor_id] = None
+
+        top_key = max(board.buckets, default=0)
+        while board.size <= top_key:
+            board.size *= 2
+        board._rebuild()
+        return board
+
+    def _rebuild(self):
+        tree = [0] * (self.size + 1)
+        for key, bucket in self.buckets.items():
+            tree[key + 1] = len(bucket)
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def _add(self, key, delta):
+        i = key + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def _count_le(self, key):
+        """Number of donors with score key <= key"""
+        total = 0
+        i = min(key + 1, self.size)
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _kth_smallest(self, k):
+        """Score key of the k-th smallest entry (1-based)"""
+        pos = 0
+        step = self.size
+        while step:
+            if pos + step <= self.size and self.tree[pos + step] < k:
+                pos += step
+                k -= self.tree[pos]
+            step //= 2
+        return pos  # index pos + 1 holds key pos
+
+    def __len__(self):
+        return len(self.scores)
+
+    def __contains__(self, donor_id):
+        return donor_id in self.scores
+
+    def update(self, donor_id, score):
+        """Insert or move a donor"""
+        if score is None or pd.isna(score):
+            self.remove(donor_id)
+            return
+        key = max(0, int(score))
+        old = self.scores.get(donor_id)
+        if old == key:
+            return
+        if old is not None:
+            self.remove(donor_id)
+
+        if key >= self.size:
+            while self.size <= key:
+                self.size *= 2
+            self._rebuild()
+        self.scores[donor_id] = key
+        self.buckets.setdefault(key, {})[donor_id] = None
+        self._add(key, 1)
+
+    def remove(self, donor_id):
+        key = self.scores.pop(donor_id, None)
+        if key is None:
+            return
+        bucket = self.buckets[key]
+        del bucket[donor_id]
+        if not bucket:
+            del self.buckets[key]
+        self._add(key, -1)
+
+    def score(self, donor_id):
+        return self.scores.get(donor_id)
+
+    def rank(self, donor_id):
+        """1-based leaderboard position, or None if the donor is not ranked"""
+        key = self.scores.get(donor_id)
+        if key is None:
+            return None
+        return len(self.scores) - self._count_le(key) + 1
+
+    def top(self, k=10):
+        """[(donor_id, score, rank)] for the k highest scores"""
+        results = []
+        remaining = len(self.scores)  # entries at or below the current score
+        while remaining > 0 and len(results) < k:
+            key = self._kth_smallest(remaining)
+            bucket = self.buckets[key]
+            rank = len(self.scores) - remaining + 1
+            for donor_id in bucket:
+                if len(results) == k:
+                    break
+                results.append((donor_id, key, rank))
+            remaining -= len(bucket)
+        return results
+
+
+class DonorLeaderboards:
+    """
+    Overall leaderboard plus sub-leaderboards per blood group, role and area
+    (area = AREA_CELL_DEG grid cell; its #1 donor is the "Local Hero")
+    """
+
+    def __init__(self):
+        self.overall = Leaderboard()
+        self.boards = {dimension: {} for dimension in LEADERBOARD_DIMENSIONS}
+        self.groups = {}  # donor_id -> {dimension: value}
+
+    @classmethod
+    def from_dataframe(cls, df_gamification, df_donors=None):
+        """
+        Build from the gamification table (user_id, score, blood_group, role);
+        areas come from df_donors latitude/longitude when given.
+        Duplicate user_ids keep their first row.
+        """
+        df = df_gamification.drop_duplicates('user_id')
+        donor_ids = df['user_id'].to_numpy()
+        scores = df['score'].to_numpy(dtype=float)
+
+        groups = {}
+        for dimension in ('blood_group', 'role'):
+            if dimension in df.columns:
+                groups[dimension] = df[dimension].astype(object).to_numpy()
+        if df_donors is not None and {'latitude', 'longitude'} <= set(df_donors.columns):
+            locations = df_donors.drop_duplicates('user_id').set_index('user_id')
+            locations = locations.reindex(donor_ids)
+            groups['area'] = area_keys(locations['latitude'], locations['longitude'])
+
+        boards = cls()
+        boards.overall = Leaderboard.from_scores(donor_ids, scores)
+        for i, donor_id in enumerate(donor_ids):
+            boards.groups[donor_id] = {
+                dimension: values[i] for dimension, values in groups.items() if not pd.isna(values[i])
+            }
+
+        for dimension, values in groups.items():
+            frame = pd.DataFrame({'user_id': donor_ids, 'score': scores, 'group': values}).dropna(subset=['group'])
+            for value, members in frame.groupby('group', sort=False):
+                boards.boards[dimension][value] = Leaderboard.from_scores(
+                    members['user_id'].to_numpy(), members['score'].to_numpy()
+                )
+        return boards
+
+    def update(self, donor_id, score, **groups):
+        """Update a donor's score (and optionally blood_group/role/area) on every board"""
+        current = self.groups.setdefault(donor_id, {})
+        for dimension, value in groups.items():
+            if dimension not in self.boards or current.get(dimension) == value:
+                continue
+            if dimension in current:
+                self.boards[dimension][current[dimension]].remove(donor_id)
+            if value is None:
+                current.pop(dimension, None)
+            else:
+                current[dimension] = value
+
+        self.overall.update(donor_id, score)
+        for dimension, value in current.items():
+            self.boards[dimension].setdefault(value, Leaderboard()).update(donor_id, score)
+
+    def update_scores(self, scores):
+        """Apply a Series of scores indexed by user_id (e.g. GamificationScoreboard.apply_events output)"""
+        for donor_id, score in scores.items():
+            self.update(donor_id, score)
+
+    def board(self, dimension=None, value=None):
+        if dimension is None:
+            return self.overall
+        return self.boards[dimension].get(value)
+
+    def rank(self, donor_id, dimension=None):
+        """Overall rank, or rank within the donor's blood_group/role/area board"""
+        if dimension is None:
+            return self.overall.rank(donor_id)
+        value = self.groups.get(donor_id, {}).get(dimension)
+        board = self.board(dimension, value)
+        return board.rank(donor_id) if board is not None else None
+
+    def top(self, k=10, dimension=None, value=None):
+        board = self.board(dimension, value)
+        return board.top(k) if board is not None else []
+
+    def is_local_hero(self, donor_id):
+        """True for the top-scoring donor(s) of their area"""
+        return self.rank(donor_id, 'area') == 1
+
+    def positions(self, donor_id):
+        """All ranks of one donor, for API responses"""
+        positions = {'overall': self.rank(donor_id), 'total_donors': len(self.overall)}
+        for dimension, value in self.groups.get(donor_id, {}).items():
+            positions[dimension] = {
+                'group': value,
+                'rank': self.rank(donor_id, dimension),
+                'total_donors': len(self.boards[dimension][value])
+            }
+        return positions
@@ -0,0 +1,119 @@
+import os
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from donor_store import DATA_DIR
+
+LABEL_ENCODERS_PATH = os.path.join(DATA_DIR, 'label_encoders.pkl')
+FEATURE_SCALER_PATH = os.path.join(DATA_DIR, 'feature_scaler.pkl')
+
+# Model input columns, in training order (notebook select_features)
+ML_FEATURE_COLUMNS = [
+    'donations_till_date', 'total_calls', 'calls_to_donations_ratio',
+    'frequency_in_days', 'cycle_of_donations', 'days_since_registration',
+    'days_since_last_donation', 'donation_frequency_score',
+    'blood_group_encoded', 'gender_encoded', 'role_encoded', 'donor_type_encoded'
+]
+
+# Categorical column -> position of its LabelEncoder in label_encoders.pkl
+CATEGORICAL_FEATURES = ['blood_group', 'gender', 'role', 'donor_type']
+
+# Donor columns prepare_ml_data reads
+FEATURE_SOURCE_COLUMNS = [
+    'donations_till_date', 'total_calls', 'calls_to_donations_ratio',
+    'frequency_in_days', 'cycle_of_donations', 'registration_date', 'last_donation_date'
+] + CATEGORICAL_FEATURES
+
+# Donor columns the training target is derived from
+TARGET_SOURCE_COLUMNS = ['user_donation_active_status', 'donations_till_date', 'eligibility_status']
+
+
+def load_label_encoders(path=LABEL_ENCODERS_PATH):
+    """(le_blood, le_gender, le_role, le_donor) as saved by the training notebook"""
+    return joblib.load(path)
+
+
+def load_feature_scaler(path=FEATURE_SCALER_PATH):
+    """StandardScaler fitted for the logistic regression model (the forest uses raw features)"""
+    return joblib.load(path)
+
+
+def _dates(df, name):
+    if name in df.columns:
+        return pd.to_datetime(df[name], errors='coerce', format='mixed')
+    return pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns]')
+
+
+def add_day_features(df_ml, registration, last_donation, now):
+    """
+    The features relative to `now`, from parsed registration / last donation
+    dates (df_ml needs donations_till_date)
+    """
+    # Days since registration
+    df_ml['days_since_registration'] = (now - registration).dt.days
+
+    # Days since last donation (default to 1 year)
+    df_ml['days_since_last_donation'] = (now - last_donation).dt.days.fillna(365)
+
+    # Donation frequency score (donations per month)
+    months = df_ml['days_since_registration'] / 30
+    with np.errstate(divide='ignore', invalid='ignore'):
+        df_ml['donation_frequency_score'] = np.where(
+            df_ml['days_since_registration'] > 0, df_ml['donations_till_date'] / months, 0
+        )
+    return df_ml
+
+
+def prepare_ml_data(df, now=None):
+    """Prepare data for machine learning models (derived features of the training notebook)"""
+    now = now or datetime.now()
+    df_ml = pd.DataFrame(index=df.index)
+
+    # Fill missing values strategically
+    for col in ['donations_till_date', 'total_calls', 'calls_to_donations_ratio',
+                'frequency_in_days', 'cycle_of_donations']:
+        values = pd.to_numeric(df[col], errors='coerce') if col in df.columns else np.nan
+        df_ml[col] = pd.Series(values, index=df.index, dtype=float).fillna(0)
+
+    add_day_features(df_ml, _dates(df, 'registration_date'), _dates(df, 'last_donation_date'), now)
+
+    for col in CATEGORICAL_FEATURES:
+        df_ml[col] = df[col].astype(object) if col in df.columns else None
+    return df_ml
+
+
+def donation_target(df):
+    """Training target of the notebook: will the donor donate again (0/1)"""
+    donations = pd.to_numeric(df['donations_till_date'], errors='coerce').fillna(0)
+    return (
+        (df['user_donation_active_status'] == 'Active').to_numpy() &
+        (donations > 0).to_numpy() &
+        (df['eligibility_status'] == 'eligible').to_numpy()
+    ).astype(int)
+
+
+def encode_labels(values, encoder):
+    """
+    LabelEncoder.transform that tolerates unseen values: they map to the
+    'Unknown' class when the encoder has one, else to class 0
+    """
+    classes = {label: i for i, label in enumerate(encoder.classes_)}
+    fallback = classes.get('Unknown', 0)
+    values = pd.Series(values, dtype=object).fillna('Unknown')
+    return values.map(classes).fillna(fallback).to_numpy(dtype=float)
+
+
+def select_features(df_ml, label_encoders):
+    """Encode categoricals with the saved encoders and return the model feature frame"""
+    X = df_ml.copy()
+    for col, encoder in zip(CATEGORICAL_FEATURES, label_encoders):
+        X[f'{col}_encoded'] = encode_labels(X[col].to_numpy(), encoder)
+    return X[ML_FEATURE_COLUMNS].fillna(0)
+
+
+def build_feature_matrix(df, label_encoders, now=None):
+    """Donor frame -> float64 model input matrix (n_donors x 12)"""
+    return select_features(prepare_ml_data(df, now), label_encoders).to_numpy(dtype=float)
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import time
+from collections import deque
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from donor_store import DATA_DIR
+from ml_features import build_feature_matrix, load_feature_scaler, load_label_encoders
+
+RF_MODEL_PATH = os.path.join(DATA_DIR, 'random_forest_donor_model.pkl')
+LR_MODEL_PATH = os.path.join(DATA_DIR, 'logistic_regression_donor_model.pkl')
+
+# Per-call latencies kept for latency_stats()
+LATENCY_WINDOW = 10000
+# Rows walked together (keeps the (rows x trees) node arrays cache-sized)
+APPLY_CHUNK_ROWS = 256
+# From this batch size scikit-learn's own predict_proba is faster: its fixed
+# per-call overhead (~9ms) is amortised and its per-row cost is lower
+SKLEARN_BATCH_ROWS = 1024
+
+
+def model_file_version(path=RF_MODEL_PATH):
+    """Short content hash of a saved model; changes whenever the model is retrained"""
+    with open(path, 'rb') as f:
+        return 'rf_' + hashlib.sha1(f.read()).hexdigest()[:10]
+
+
+def _with_feature_names(estimator, X):
+    """X as a DataFrame with the columns the estimator was fitted with (no sklearn feature-name warning)"""
+    names = getattr(estimator, 'feature_names_in_', None)
+    return X if names is None else pd.DataFrame(X, columns=names)
+
+
+class CompiledForest:
+    """
+    scikit-learn tree ensemble flattened into contiguous node arrays
+    All trees share one set of arrays (children, split feature, threshold,
+    leaf class probabilities); predict_proba walks every (sample, tree) pair
+    down one level per step with NumPy fancy indexing, so a batch needs at
+    most max_depth vectorized steps and no per-call estimator overhead.
+    """
+
+    def __init__(self, forest):
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            left = tree.children_left.astype(np.int64)
+            right = tree.children_right.astype(np.int64)
+            is_leaf = left == -1
+
+            # Leaves point to themselves so finished walks stay put
+            node_ids = np.arange(tree.node_count, dtype=np.int64) + offset
+            lefts.append(np.where(is_leaf, node_ids, left + offset))
+            rights.append(np.where(is_leaf, node_ids, right + offset))
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int64))
+            thresholds.append(tree.threshold.astype(np.float64))
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            totals = value.sum(axis=1, keepdims=True)
+            values.append(np.divide(value, totals, out=np.zeros_like(value), where=totals > 0))
+
+            roots.append(offset)
+            offset += tree.node_count
+            depth = max(depth, tree.max_depth)
+
+        self.left = np.concatenate(lefts)
+        self.right = np.concatenate(rights)
+        self.feature = np.concatenate(features)
+        self.threshold = np.concatenate(thresholds)
+        self.value = np.concatenate(values)
+        self.roots = np.asarray(roots, dtype=np.int64)
+        self.max_depth = depth
+        self.classes_ = forest.classes_
+        self.n_features = forest.n_features_in_
+
+    @property
+    def node_count(self):
+        return len(self.left)
+
+    def apply(self, X):
+        """Leaf node id per (sample, tree)"""
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_features = X.shape[1]
+        leaves = []
+        for start in range(0, len(X), APPLY_CHUNK_ROWS):
+            chunk = X[start:start + APPLY_CHUNK_ROWS]
+            flat = chunk.ravel()
+            row_offsets = (np.arange(len(chunk)) * n_features)[:, None]
+            nodes = np.broadcast_to(self.roots, (len(chunk), len(self.roots))).copy()
+            for _ in range(self.max_depth):
+                go_left = flat.take(row_offsets + self.feature.take(nodes)) <= self.threshold.take(nodes)
+                nodes = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+            leaves.append(nodes)
+        return np.concatenate(leaves) if leaves else np.empty((0, len(self.roots)), dtype=np.int64)
+
+    def predict_proba(self, X):
+        """Mean of the trees' leaf class probabilities, like RandomForestClassifier.predict_proba"""
+        return self.value[self.apply(X)].mean(axis=1)
+
+    def contributions(self, X, class_index):
+        """
+        Per-feature decision-path attributions for one class
+        Every split a sample passes moves its class probability from the
+        parent node's value to the child's; that change is credited to the
+        split feature and averaged over the trees. Returns (bias, contribs)
+        with bias + contribs.sum(axis=1) == predict_proba(X)[:, class_index].
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_features = X.shape[1]
+        n_trees = len(self.roots)
+        class_value = self.value[:, class_index]
+        bias = float(class_value[self.roots].mean())
+        contribs = []
+        for start in range(0, len(X), APPLY_CHUNK_ROWS):
+            chunk = X[start:start + APPLY_CHUNK_ROWS]
+            flat = chunk.ravel()
+            row_offsets = (np.arange(len(chunk)) * n_features)[:, None]
+            nodes = np.broadcast_to(self.roots, (len(chunk), n_trees)).copy()
+            totals = np.zeros(len(chunk) * n_features)
+            for _ in range(self.max_depth):
+                feature = self.feature.take(nodes)
+                go_left = flat.take(row_offsets + feature) <= self.threshold.take(nodes)
+                children = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+                # Leaves point to themselves, so finished walks add 0
+                delta = class_value.take(children) - class_value.take(nodes)
+                totals += np.bincount((row_offsets + feature).ravel(), weights=delta.ravel(),
+                                      minlength=len(totals))
+                nodes = children
+            contribs.append(totals.reshape(len(chunk), n_features) / n_trees)
+        if not contribs:
+            return bias, np.empty((0, n_features))
+        return bias, np.concatenate(contribs)
+
+
+class DonorModelServer:
+    """
+    Donor propensity model loaded once for serving
+    - the random forest runs through CompiledForest
+    - categorical features go through the saved label encoders
+    - feature_scaler.pkl is applied only for the logistic regression model
+      (the forest was trained on unscaled features)
+    - every call's latency is recorded for latency_stats()
+    """
+
+    def __init__(self, rf_model, label_encoders=None, scaler=None, lr_model=None, version=None):
+        self.rf_model = rf_model
+        self.version = version  # model_file_version() of the loaded pickle
+        self.forest = CompiledForest(rf_model)
+        self.label_encoders = label_encoders
+        self.scaler = scaler
+        self.lr_model = lr_model
+        self.positive_class = int(np.flatnonzero(self.forest.classes_ == 1)[0])
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+
+    @classmethod
+    def load(cls, rf_path=RF_MODEL_PATH, with_logistic_regression=False):
+        """Load the forest and preprocessing objects saved by the training notebook"""
+        scaler = lr_model = None
+        if with_logistic_regression:
+            scaler = load_feature_scaler()
+            lr_model = joblib.load(LR_MODEL_PATH)
+        return cls(joblib.load(rf_path), load_label_encoders(), scaler, lr_model,
+                   version=model_file_version(rf_path))
+
+    def _record(self, started, n_rows):
+        self.latencies.append(((time.perf_counter() - started) * 1e6, n_rows))
+        self.calls += 1
+
+    def predict_proba(self, feature_matrix):
+        """P(will donate again) per row of a (n, 12) feature matrix"""
+        started = time.perf_counter()
+        X = np.asarray(feature_matrix, dtype=float)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.forest.n_features:
+            raise ValueError(f"Expected {self.forest.n_features} features, got {X.shape[1]}")
+        X = np.nan_to_num(X, nan=0.0)
+        if len(X) >= SKLEARN_BATCH_ROWS:
+            probabilities = self.rf_model.predict_proba(_with_feature_names(self.rf_model, X))[:, self.positive_class]
+        else:
+            probabilities = self.forest.predict_proba(X)[:, self.positive_class]
+        self._record(started, len(X))
+        return probabilities
+
+    def predict_proba_lr(self, feature_matrix):
+        """Logistic regression probabilities (scaled features, as in training)"""
+        if self.lr_model is None or self.scaler is None:
+            raise ValueError("Logistic regression model not loaded (use load(with_logistic_regression=True))")
+        started = time.perf_counter()
+        X = np.nan_to_num(np.asarray(feature_matrix, dtype=float), nan=0.0)
+        X = self.scaler.transform(_with_feature_names(self.scaler, X))
+        probabilities = self.lr_model.predict_proba(X)[:, list(self.lr_model.classes_).index(1)]
+        self._record(started, len(X))
+        return probabilities
+
+    def build_features(self, donors, now=None):
+        """Donor frame -> model feature matrix with the saved label encoders"""
+        if self.label_encoders is None:
+            self.label_encoders = load_label_encoders()
+        return build_feature_matrix(donors, self.label_encoders, now)
+
+    def score_donors(self, donors, now=None):
+        """0-100 donation likelihood for every row of a donor frame"""
+        return self.predict_proba(self.build_features(donors, now)) * 100
+
+    def latency_stats(self):
+        """Per-call latency percentiles in microseconds over the last LATENCY_WINDOW calls"""
+        if not self.latencies:
+            return {'calls': self.calls}
+        latencies = np.array([latency for latency, _ in self.latencies])
+        rows = np.array([n for _, n in self.latencies])
+        return {
+            'calls': self.calls,
+            'rows_per_call': float(rows.mean()),
+            'mean_us': float(latencies.mean()),
+            'p50_us': float(np.percentile(latencies, 50)),
+            'p95_us': float(np.percentile(latencies, 95)),
+            'p99_us': float(np.percentile(latencies, 99)),
+            'max_us': float(latencies.max())
+        }
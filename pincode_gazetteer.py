@@ -0,0 +1,136 @@
+# pincode_gazetteer.py
+# Offline pincode -> coordinates lookup for the SMS emergency path.
+# pincode_gazetteer.csv holds 6-digit pincodes plus shorter prefixes (3 digits =
+# the postal sorting district) with their centroids; a pincode missing from the
+# file resolves to its longest listed prefix. The shipped file covers the
+# major cities; load the full India Post directory with
+#   python pincode_gazetteer.py --import all_india_pincode_directory.csv
+import argparse
+import os
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from donor_store import DATA_DIR
+
+PINCODE_GAZETTEER_CSV = os.path.join(DATA_DIR, 'pincode_gazetteer.csv')
+PINCODE_CACHE_SIZE = 4096
+
+# Prefix length -> precision reported for a match at that length
+PRECISIONS = {6: 'pincode', 3: 'district', 2: 'region', 1: 'zone'}
+
+
+class PincodeGazetteer:
+    """
+    Pincodes and prefixes as sorted integer keys per length with centroid
+    arrays; a lookup is one binary search per prefix length
+    """
+
+    def __init__(self, codes, latitudes, longitudes, names):
+        codes = pd.Series(codes, dtype=str).str.strip()
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.names = np.asarray(names, dtype=object)
+
+        valid = codes.str.fullmatch(r'\d{1,6}').to_numpy()
+        lengths = codes.str.len().to_numpy()
+        self.index = {}
+        for length in sorted(set(lengths[valid]), reverse=True):
+            rows = np.flatnonzero(valid & (lengths == length))
+            keys = codes.to_numpy()[rows].astype(np.int64)
+            order = np.argsort(keys, kind='stable')
+            self.index[int(length)] = (keys[order], rows[order])
+
+    @classmethod
+    def from_csv(cls, path=PINCODE_GAZETTEER_CSV):
+        df = pd.read_csv(path, dtype={'pincode': str})
+        names = df['locality'].fillna(df['district']).fillna('')
+        return cls(df['pincode'], df['latitude'], df['longitude'], names)
+
+    def __len__(self):
+        return sum(len(keys) for keys, _ in self.index.values())
+
+    def resolve(self, pincode):
+        """(latitude, longitude, precision, name) for a pincode, or None when no prefix is known"""
+        pincode = str(pincode).strip()
+        if not pincode.isdigit():
+            return None
+        for length, (keys, rows) in self.index.items():
+            if len(pincode) < length:
+                continue
+            key = int(pincode[:length])
+            i = np.searchsorted(keys, key)
+            if i < len(keys) and keys[i] == key:
+                row = rows[i]
+                return (float(self.latitudes[row]), float(self.longitudes[row]),
+                        PRECISIONS.get(length, f'prefix{length}'), self.names[row])
+        return None
+
+
+_gazetteer = None
+
+
+def get_gazetteer():
+    """The gazetteer in pincode_gazetteer.csv, loaded on first use"""
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = PincodeGazetteer.from_csv()
+    return _gazetteer
+
+
+@lru_cache(maxsize=PINCODE_CACHE_SIZE)
+def lookup_pincode(pincode):
+    """get_gazetteer().resolve(pincode), cached per pincode"""
+    return get_gazetteer().resolve(pincode)
+
+
+def import_directory(source_csv, output_csv=PINCODE_GAZETTEER_CSV):
+    """
+    Build the gazetteer file from the India Post pincode directory (one row
+    per post office: pincode, officename, district, statename, latitude,
+    longitude): per-pincode and per-district (3-digit prefix) median centroids.
+    Returns the number of pincodes written.
+    """
+    df = pd.read_csv(source_csv, dtype=str)
+    df.columns = [c.strip().lower() for c in df.columns]
+    if 'district' not in df.columns:
+        df = df.rename(columns={'districtname': 'district'})
+    df['pincode'] = df['pincode'].str.strip()
+    for col in ('latitude', 'longitude'):
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    # Keep coordinates inside India's bounding box (the directory has blanks and swapped pairs)
+    df = df[df['pincode'].str.fullmatch(r'\d{6}', na=False)
+            & df['latitude'].between(6, 38) & df['longitude'].between(68, 98)]
+
+    pincodes = df.groupby('pincode').agg(
+        locality=('officename', 'first'), district=('district', 'first'), state=('statename', 'first'),
+        latitude=('latitude', 'median'), longitude=('longitude', 'median')
+    ).reset_index()
+    districts = df.assign(pincode=df['pincode'].str[:3]).groupby('pincode').agg(
+        district=('district', lambda s: s.mode().iloc[0]), state=('statename', lambda s: s.mode().iloc[0]),
+        latitude=('latitude', 'median'), longitude=('longitude', 'median')
+    ).reset_index()
+    districts['locality'] = ''
+
+    columns = ['pincode', 'locality', 'district', 'state', 'latitude', 'longitude']
+    pd.concat([pincodes[columns], districts[columns]]).to_csv(output_csv, index=False, float_format='%.4f')
+    return len(pincodes)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline pincode gazetteer")
+    parser.add_argument('--import', dest='source', help="India Post pincode directory CSV to import")
+    parser.add_argument('pincodes', nargs='*', help="pincodes to look up")
+    args = parser.parse_args()
+
+    if args.source:
+        count = import_directory(args.source)
+        print(f"✅ {count:,} pincodes written to {PINCODE_GAZETTEER_CSV}")
+    for pincode in args.pincodes:
+        match = lookup_pincode(pincode)
+        print(f"{pincode}: {match if match else 'unknown'}")
+    if not args.source and not args.pincodes:
+        parser.print_help()
+        sys.exit(1)
@@ -0,0 +1,134 @@
+# pipeline_metrics.py
+# Latency histograms and counters for the emergency pipeline stages, shared by
+# EmergencySystem, the donor ranking and the alert dispatcher in one process.
+# summary() gives recent p50/p95/p99 per stage (dashboard, /health);
+# to_prometheus() renders the Prometheus text exposition format (/metrics).
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+# Pipeline stages in request order
+EMERGENCY_STAGES = [
+    'parse', 'geocode', 'compatibility_filter', 'scoring', 'model_inference',
+    'batch_assignment', 'alert_build', 'dispatch', 'end_to_end'
+]
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Observations per stage kept for the percentiles in summary()
+LATENCY_WINDOW = 10000
+
+
+class PipelineMetrics:
+    """
+    Per-stage latency histogram (cumulative, for Prometheus), recent-window
+    percentiles and error counters, plus request outcome counters
+    Thread-safe: stages are timed from worker threads and the event loop.
+    """
+
+    def __init__(self, prefix='blood_bridge_emergency', buckets=LATENCY_BUCKETS, stages=EMERGENCY_STAGES):
+        self.prefix = prefix
+        self.buckets = np.asarray(buckets, dtype=float)
+        self.stages = list(stages)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.bucket_counts = {}
+            self.sums = {}
+            self.counts = {}
+            self.errors = {}
+            self.recent = {}
+            self.outcomes = {}
+
+    def observe(self, stage, seconds):
+        """Record one stage latency (seconds)"""
+        with self.lock:
+            if stage not in self.counts:
+                self.bucket_counts[stage] = np.zeros(len(self.buckets) + 1, dtype=np.int64)  # last = +Inf
+                self.sums[stage] = 0.0
+                self.counts[stage] = 0
+                self.recent[stage] = deque(maxlen=LATENCY_WINDOW)
+                if stage not in self.stages:
+                    self.stages.append(stage)
+            self.bucket_counts[stage][np.searchsorted(self.buckets, seconds)] += 1
+            self.sums[stage] += seconds
+            self.counts[stage] += 1
+            self.recent[stage].append(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """with metrics.time('parse'): ... records the block's latency (and errors raised in it)"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            with self.lock:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+            raise
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def count_outcome(self, status):
+        """Count one finished request by result status ('success', 'error', ...)"""
+        with self.lock:
+            self.outcomes[status] = self.outcomes.get(status, 0) + 1
+
+    def stage_stats(self, stage):
+        """Latency percentiles in milliseconds over the last LATENCY_WINDOW observations"""
+        with self.lock:
+            recent = np.array(self.recent.get(stage, ()), dtype=float) * 1000
+            count = self.counts.get(stage, 0)
+            errors = self.errors.get(stage, 0)
+        if not len(recent):
+            return {'count': count, 'errors': errors}
+        return {
+            'count': count,
+            'errors': errors,
+            'mean_ms': float(recent.mean()),
+            'p50_ms': float(np.percentile(recent, 50)),
+            'p95_ms': float(np.percentile(recent, 95)),
+            'p99_ms': float(np.percentile(recent, 99)),
+            'max_ms': float(recent.max())
+        }
+
+    def summary(self):
+        """stage -> stage_stats() for every stage observed so far, in pipeline order"""
+        return {stage: self.stage_stats(stage) for stage in self.stages if stage in self.counts}
+
+    def to_prometheus(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        name = f'{self.prefix}_stage_seconds'
+        lines = [f'# HELP {name} Emergency pipeline stage latency in seconds',
+                 f'# TYPE {name} histogram']
+        with self.lock:
+            for stage in self.stages:
+                if stage not in self.counts:
+                    continue
+                cumulative = np.cumsum(self.bucket_counts[stage])
+                for bound, count in zip(self.buckets, cumulative):
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{bound:g}"}} {count}')
+                lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {cumulative[-1]}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {self.sums[stage]:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {self.counts[stage]}')
+
+            errors = f'{self.prefix}_stage_errors_total'
+            lines += [f'# HELP {errors} Exceptions raised inside a pipeline stage',
+                      f'# TYPE {errors} counter']
+            for stage in self.stages:
+                if stage in self.counts:
+                    lines.append(f'{errors}{{stage="{stage}"}} {self.errors.get(stage, 0)}')
+
+            requests = f'{self.prefix}_requests_total'
+            lines += [f'# HELP {requests} Emergency requests by result status',
+                      f'# TYPE {requests} counter']
+            for status, count in sorted(self.outcomes.items()):
+                lines.append(f'{requests}{{status="{status}"}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide metrics of the emergency pipeline
+EMERGENCY_METRICS = PipelineMetrics()
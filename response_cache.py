@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_TTL_SECONDS = 15 * 60
+
+_MISSING = object()
+
+
+def forecast_key(blood_group, horizon, model_version, forecast_date=None, kind='forecast', data_version=None):
+    """
+    Cache key for a forecast-derived response: (kind, blood_group, horizon,
+    date, model version, data version); data_version is for responses that
+    also depend on the donor data (e.g. supply vs demand)
+    """
+    return (kind, blood_group, horizon, (forecast_date or date.today()).isoformat(), model_version, data_version)
+
+
+class ResponseCache:
+    """
+    Thread-safe TTL + LRU cache for computed responses
+    - entries expire ttl_seconds after they were stored
+    - at most maxsize entries; the least recently used one is evicted first
+    - hit / miss / eviction / expiration counters for monitoring
+    Keys include the model version, so a retrained model never serves stale
+    entries; invalidate() frees them early.
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            entry = self.entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """Cached value for key, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, predicate=None):
+        """Drop all entries, or those whose key matches predicate(key); returns the count"""
+        with self.lock:
+            keys = [k for k in self.entries if predicate is None or predicate(k)]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
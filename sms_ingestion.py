@@ -0,0 +1,170 @@
+# sms_ingestion.py
+# Inbound SMS stage in front of EmergencySystem. Messages are parsed and
+# deduplicated as they arrive (a sender repeating HELP for the same pincode
+# within the window is answered from the first request, unless that one
+# failed), then queued for a pool of workers. Ranking runs in a thread pool, so
+# one slow request does not hold up the rest, and the bounded queue pushes back
+# on the producer when an SMS storm outruns the workers.
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from blood_compatibility import normalize_blood_group, to_short_blood_group
+from emergency_system import parse_help_message
+
+SMS_WORKERS = 8
+SMS_QUEUE_SIZE = 1000
+# Repeat HELPs from one sender for one pincode within this window are duplicates
+DEDUP_WINDOW_SECONDS = 300
+
+
+def _failed(future):
+    """Finished without a successful emergency result"""
+    return future.done() and (future.result() or {}).get('status') != 'success'
+
+
+class SmsIngestor:
+    """
+    Queue + worker pool for inbound emergency SMS
+    submit() parses, deduplicates and enqueues a message and returns a future
+    for its result (the EmergencySystem result, or a status dict for ignored
+    and duplicate messages). With a batcher (emergency_matching.EmergencyBatcher)
+    requests are matched through it instead of one by one.
+    """
+
+    def __init__(self, emergency_system, batcher=None, workers=SMS_WORKERS,
+                 queue_size=SMS_QUEUE_SIZE, dedup_seconds=DEDUP_WINDOW_SECONDS):
+        self.emergency_system = emergency_system
+        self.batcher = batcher
+        self.workers = workers
+        self.queue_size = queue_size
+        self.dedup_seconds = dedup_seconds
+        self.queue = None
+        self.executor = None
+        self.tasks = []
+        self.recent = {}  # (sender, blood group, pincode) -> (received at, result future)
+        self.stats = {'received': 0, 'ignored': 0, 'duplicates': 0, 'processed': 0, 'errors': 0}
+
+    def start(self):
+        """Start the workers (on the running event loop); called by submit() if needed"""
+        if self.tasks:
+            return self
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='sms-worker')
+        self.tasks = [asyncio.get_running_loop().create_task(self._worker()) for _ in range(self.workers)]
+        return self
+
+    async def stop(self):
+        """Finish the queued messages, then stop the workers"""
+        if not self.tasks:
+            return
+        await self.queue.join()
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.executor.shutdown(wait=False)
+
+    def _dedup_key(self, sender, text):
+        parsed = parse_help_message(text)
+        if parsed is None:
+            return None, None
+        blood_group, pincode = parsed
+        name = normalize_blood_group(blood_group)
+        # Canonical form for EmergencySystem ("HELP O POS" -> "HELP O+")
+        message = f"HELP {to_short_blood_group(name)} {pincode}"
+        return (str(sender), name, pincode), message
+
+    def _forget_expired(self, now):
+        if len(self.recent) > self.queue_size:
+            cutoff = now - self.dedup_seconds
+            self.recent = {key: value for key, value in self.recent.items() if value[0] >= cutoff}
+
+    async def submit(self, sender, text):
+        """
+        Accept one inbound SMS; waits while the queue is full (backpressure).
+        Returns an asyncio future resolving to the request's result.
+        """
+        self.start()
+        self.stats['received'] += 1
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        key, message = self._dedup_key(sender, text)
+        if key is None:
+            self.stats['ignored'] += 1
+            future.set_result({'status': 'ignored', 'message': 'Not an emergency request (expected "HELP <blood group> <pincode>")'})
+            return future
+
+        now = time.monotonic()
+        self._forget_expired(now)
+        previous = self.recent.get(key)
+        if previous is not None and now - previous[0] < self.dedup_seconds and not _failed(previous[1]):
+            self.stats['duplicates'] += 1
+            duplicate = loop.create_future()
+            previous[1].add_done_callback(lambda done: self._answer_duplicate(done, duplicate, sender, text))
+            return duplicate
+
+        self.recent[key] = (now, future)
+        # Failed requests are forgotten, so the sender's retry goes through
+        future.add_done_callback(lambda done: self._forget_failed(key, done))
+        await self.queue.put((message, future))
+        return future
+
+    def _forget_failed(self, key, future):
+        entry = self.recent.get(key)
+        if _failed(future) and entry is not None and entry[1] is future:
+            del self.recent[key]
+
+    def _answer_duplicate(self, original, duplicate, sender, text):
+        """Share the original's result, or resubmit the duplicate when the original failed"""
+        if duplicate.done():
+            return
+        if not _failed(original):
+            duplicate.set_result(dict(original.result(), duplicate=True))
+            return
+        retry = asyncio.ensure_future(self.ingest(sender, text))
+        retry.add_done_callback(
+            lambda done: duplicate.done() or duplicate.set_result(
+                done.result() if done.exception() is None else {'status': 'error', 'message': str(done.exception())}
+            )
+        )
+
+    async def ingest(self, sender, text):
+        """submit() and wait for the result"""
+        return await (await self.submit(sender, text))
+
+    async def consume(self, inbound):
+        """Feed (sender, text) pairs from an asyncio.Queue until a None sentinel"""
+        while True:
+            item = await inbound.get()
+            if item is None:
+                break
+            await self.submit(*item)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        system = self.emergency_system
+        while True:
+            message, future = await self.queue.get()
+            try:
+                if self.batcher is not None:
+                    result = await self.batcher.submit(message)
+                else:
+                    result = await loop.run_in_executor(self.executor, system.prepare_emergency_alerts, message)
+                if system.dispatcher is not None and result and result['status'] == 'success':
+                    receipts = await system.dispatcher.dispatch(result['top_donors'])
+                    result = system.attach_receipts(result, receipts)
+                if result is None or result['status'] != 'success':
+                    self.stats['errors'] += 1
+                self.stats['processed'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                result = {'status': 'error', 'message': str(e)}
+            finally:
+                self.queue.task_done()
+            if not future.done():
+                future.set_result(result)
+
+    def queue_depth(self):
+        return self.queue.qsize() if self.queue is not None else 0
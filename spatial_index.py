@@ -0,0 +1,52 @@
+import numpy as np
+from sklearn.neighbors import BallTree
+
+EARTH_RADIUS_KM = 6371.0088
+
+
+class DonorSpatialIndex:
+    """
+    Ball tree over donor latitude/longitude (haversine metric)
+    Built once; answers radius lookups nearest-first
+    """
+
+    def __init__(self, latitudes, longitudes):
+        latitudes = np.asarray(latitudes, dtype=float)
+        longitudes = np.asarray(longitudes, dtype=float)
+
+        # Donors without coordinates cannot be placed on the map
+        valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        self.positions = np.flatnonzero(valid)
+        self.size = len(latitudes)
+
+        points = np.radians(np.column_stack([latitudes[valid], longitudes[valid]]))
+        self.tree = BallTree(points, metric='haversine') if len(points) else None
+
+    @classmethod
+    def from_dataframe(cls, df, lat_col='latitude', lon_col='longitude'):
+        """Build an index over a donor DataFrame (positions are row positions)"""
+        return cls(df[lat_col].to_numpy(dtype=float), df[lon_col].to_numpy(dtype=float))
+
+    def query_radius(self, latitude, longitude, radius_km):
+        """
+        Row positions of donors within radius_km of a point, nearest first
+        Returns (positions, distances_km)
+        """
+        if self.tree is None:
+            return np.empty(0, dtype=int), np.empty(0)
+
+        point = np.radians([[latitude, longitude]])
+        indices, distances = self.tree.query_radius(
+            point, r=radius_km / EARTH_RADIUS_KM, return_distance=True, sort_results=True
+        )
+        return self.positions[indices[0]], distances[0] * EARTH_RADIUS_KM
+
+    def query_nearest(self, latitude, longitude, k):
+        """Row positions of the k nearest donors, nearest first. Returns (positions, distances_km)"""
+        if self.tree is None:
+            return np.empty(0, dtype=int), np.empty(0)
+
+        k = min(k, len(self.positions))
+        point = np.radians([[latitude, longitude]])
+        distances, indices = self.tree.query(point, k=k)
+        return self.positions[indices[0]], distances[0] * EARTH_RADIUS_KM
@@ -0,0 +1,180 @@
+# supply_projection.py
+# Blood supply vs forecast demand per recipient group. Donors are reduced once
+# to per-group counts (total, active, and eligible by day: bucket 0 = eligible
+# today, bucket k = next_eligible_date k days out), so compatible supply for
+# all eight groups is one product with the 8x8 compatibility matrix and the
+# day-by-day stock projection is a cumulative sum over the forecast horizon.
+# Shortage alerts are recomputed in milliseconds when the forecast changes; the
+# dashboard recounts the donors once per donor data version.
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from blood_compatibility import BLOOD_GROUPS, compatibility_matrix, normalize_blood_group
+
+# Share of eligible donors expected to donate within a month
+MONTHLY_DONATION_RATE = 0.3
+DAILY_DONATION_RATE = MONTHLY_DONATION_RATE / 30
+# Eligibility dates tracked day by day; later ones count as "not within the horizon"
+PROJECTION_DAYS = 90
+# supply / demand ratio bands for the status column
+SURPLUS_RATIO = 1.2
+SHORTAGE_RATIO = 0.8
+
+
+class SupplyProjection:
+    """
+    Per-donor-group supply counts of a donor table, projected against a demand
+    forecast (BloodDemandForecaster.forecast_demand output)
+    Recipient-side numbers are self.matrix @ counts: donors of every group that
+    can give to the recipient, as CompatibilityIndex.select() would return.
+    """
+
+    def __init__(self, df=None, as_of=None, blood_groups=BLOOD_GROUPS, days=PROJECTION_DAYS):
+        self.blood_groups = list(blood_groups)
+        self.group_names = [normalize_blood_group(group) for group in self.blood_groups]
+        self.matrix = compatibility_matrix(self.blood_groups)
+        self.as_of = pd.Timestamp(as_of or datetime.now()).normalize()
+        self.days = days
+
+        n_groups = len(self.blood_groups)
+        self.total = np.zeros(n_groups, dtype=np.int64)
+        self.active = np.zeros(n_groups, dtype=np.int64)
+        # Last column: not eligible within `days` (no eligibility date, or a later one)
+        self.eligible_by_day = np.zeros((n_groups, days + 2), dtype=np.int64)
+        if df is not None:
+            self.apply_donor_changes(after=df)
+
+    @classmethod
+    def from_dataframe(cls, df, as_of=None):
+        return cls(df, as_of=as_of)
+
+    def _donor_counts(self, df):
+        """(total, active, eligible_by_day) count arrays of some donor rows"""
+        raw_codes, raw_names = pd.factorize(pd.Series(df['blood_group']), use_na_sentinel=True)
+        remap = np.array([self.group_names.index(name) if name in self.group_names else -1
+                          for name in map(normalize_blood_group, raw_names)] + [-1], dtype=np.int64)
+        codes = remap[raw_codes]  # missing blood group (-1) hits the trailing -1
+        known = codes >= 0
+
+        # Eligible today (or deferral already over), else the day next_eligible_date
+        # comes round; no date or one beyond the horizon -> last bucket
+        next_eligible = pd.to_datetime(pd.Series(df['next_eligible_date']), errors='coerce')
+        days_out = np.ceil(((next_eligible - self.as_of) / pd.Timedelta(days=1)).to_numpy(dtype=float))
+        within = days_out <= self.days  # False for NaT
+        bucket = np.where(within, np.clip(np.nan_to_num(days_out), 0, None), self.days + 1).astype(np.int64)
+        bucket[(pd.Series(df['eligibility_status']) == 'eligible').to_numpy()] = 0
+
+        n_groups, width = self.eligible_by_day.shape
+        active = (pd.Series(df['user_donation_active_status']) == 'Active').to_numpy()
+        return (np.bincount(codes[known], minlength=n_groups),
+                np.bincount(codes[known & active], minlength=n_groups),
+                np.bincount(codes[known] * width + bucket[known], minlength=n_groups * width).reshape(n_groups, width))
+
+    def apply_donor_changes(self, before=None, after=None):
+        """
+        Update the counts for changed donors: before = their old rows (None for
+        new donors), after = their new rows (None for removed ones)
+        """
+        for rows, sign in ((before, -1), (after, 1)):
+            if rows is None or not len(rows):
+                continue
+            total, active, eligible_by_day = self._donor_counts(rows)
+            self.total += sign * total
+            self.active += sign * active
+            self.eligible_by_day += sign * eligible_by_day
+
+    # Recipient-side counts
+
+    def compatible_donors(self):
+        return self.matrix @ self.total
+
+    def compatible_active_donors(self):
+        return self.matrix @ self.active
+
+    def compatible_eligible_donors(self, offsets=(0,)):
+        """Recipient group x day: compatible donors eligible `offset` days after as_of"""
+        offsets = np.clip(np.asarray(offsets, dtype=np.int64), 0, self.days)
+        eligible = np.cumsum(self.eligible_by_day[:, :self.days + 1], axis=1)
+        return self.matrix @ eligible[:, offsets]
+
+    # Projection against a forecast
+
+    def demand_matrix(self, forecast_df):
+        """(forecast dates, blood group x day predicted demand); groups missing from the forecast get 0"""
+        day_codes, dates = pd.factorize(pd.DatetimeIndex(forecast_df['date']).normalize(), sort=True)
+        group_codes = pd.Index(self.blood_groups).get_indexer(forecast_df['blood_group'])
+        known = group_codes >= 0
+        n_groups = len(self.blood_groups)
+        demand = np.bincount(group_codes[known] * len(dates) + day_codes[known],
+                             weights=forecast_df['predicted_demand'].to_numpy(dtype=float)[known],
+                             minlength=n_groups * len(dates))
+        return pd.DatetimeIndex(dates), demand.reshape(n_groups, len(dates))
+
+    def _project(self, forecast_df, initial_stock=None):
+        dates, demand = self.demand_matrix(forecast_df)
+        offsets = ((dates - self.as_of) / pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+        eligible = self.compatible_eligible_donors(offsets)
+        supply = eligible * DAILY_DONATION_RATE
+        stock = np.zeros(len(self.blood_groups)) if initial_stock is None else \
+            np.array([initial_stock.get(group, 0) for group in self.blood_groups], dtype=float)
+        stock = stock[:, None] + np.cumsum(supply - demand, axis=1)
+        return dates, eligible, supply, demand, stock
+
+    def project(self, forecast_df, initial_stock=None):
+        """
+        Day-by-day projection, one row per (date, blood group): compatible
+        eligible donors, estimated supply (DAILY_DONATION_RATE of them),
+        predicted demand and the stock left after the day's demand, starting
+        from initial_stock ({blood group: units}, default 0)
+        """
+        dates, eligible, supply, demand, stock = self._project(forecast_df, initial_stock)
+        n_groups = len(self.blood_groups)
+        return pd.DataFrame({
+            'date': np.repeat(dates.to_numpy(), n_groups),
+            'blood_group': np.tile(np.asarray(self.blood_groups, dtype=object), len(dates)),
+            'eligible_donors': eligible.T.ravel(),
+            'estimated_supply': supply.T.ravel(),
+            'predicted_demand': demand.T.ravel(),
+            'projected_stock': stock.T.ravel()
+        })
+
+    def gap_analysis(self, forecast_df, initial_stock=None):
+        """
+        One row per blood group: today's compatible donors and supply, the
+        supply / demand ratio over the horizon (donors coming off their
+        deferral included), the final projected stock and the first day it
+        drops below zero (shortage_date, NaT when it never does)
+        """
+        dates, eligible, supply, demand, stock = self._project(forecast_df, initial_stock)
+        today = self.compatible_eligible_donors()[:, 0]
+        avg_supply = supply.mean(axis=1)
+        avg_demand = demand.mean(axis=1)
+        ratio = avg_supply / np.maximum(1, avg_demand)
+        shortage_date = [dates[row.argmax()] if row.any() else pd.NaT for row in stock < 0]
+
+        return pd.DataFrame({
+            'blood_group': self.blood_groups,
+            'total_donors': self.compatible_donors(),
+            'active_donors': self.compatible_active_donors(),
+            'eligible_donors': today,
+            'estimated_daily_supply': today * DAILY_DONATION_RATE,
+            'projected_daily_supply': avg_supply,
+            'avg_daily_demand': avg_demand,
+            'total_predicted_demand': demand.sum(axis=1),
+            'supply_demand_ratio': ratio,
+            'status': np.where(ratio > SURPLUS_RATIO, 'Surplus', np.where(ratio > SHORTAGE_RATIO, 'Balanced', 'Shortage')),
+            'projected_stock': stock[:, -1],
+            'shortage_date': pd.to_datetime(pd.Series(shortage_date, dtype='datetime64[ns]'))
+        })
+
+    def shortage_alerts(self, forecast_df, initial_stock=None):
+        """Blood groups whose projected stock runs out within the forecast, earliest first"""
+        gaps = self.gap_analysis(forecast_df, initial_stock)
+        gaps = gaps[gaps['shortage_date'].notna()].sort_values('shortage_date', kind='stable')
+        return [
+            {'blood_group': row.blood_group, 'shortage_date': row.shortage_date,
+             'projected_stock': float(row.projected_stock), 'status': row.status}
+            for row in gaps.itertuples(index=False)
+        ]
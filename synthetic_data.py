@@ -0,0 +1,254 @@
+# synthetic_data.py
+# Seeded synthetic donor tables and demand histories for load testing:
+#   python synthetic_data.py --donors 1000000 --days 1825 --store-dir /tmp/bb_store
+# Donors are drawn in vectorized chunks and streamed straight into a columnar
+# donor store (donor_store.TableWriter), so millions of rows never sit in
+# memory as one DataFrame. Their distributions follow hackathon_data.csv
+# (roles, blood groups, donation history per role) and they cluster around
+# the cities of emergency_system.PINCODE_COORDINATES.
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from demand_forecasting import generate_demand_history
+from donor_store import STORE_DIR, TableWriter
+from emergency_system import PINCODE_COORDINATES
+
+SYNTHETIC_CHUNK_ROWS = 100_000
+DEFAULT_SEED = 42
+
+# Share of donors per city (pincode of the city centre)
+CITY_WEIGHTS = {'500001': 0.55, '560001': 0.15, '400001': 0.15, '110001': 0.15}
+# Donors live in a dense core around the centre or spread over the metro area
+CITY_CORE_SHARE = 0.7
+CITY_CORE_SIGMA_DEG = 0.03    # ~3 km
+CITY_METRO_SIGMA_DEG = 0.15   # ~15 km
+MISSING_LOCATION_RATE = 0.003
+
+ROLE_WEIGHTS = {
+    'Guest': 0.344, 'Emergency Donor': 0.339, 'Bridge Donor': 0.293,
+    'Patient': 0.012, 'Volunteer': 0.012
+}
+DONOR_TYPE_BY_ROLE = {'Emergency Donor': 'One-Time Donor', 'Bridge Donor': 'Regular Donor'}
+# Per role: P(donated before), geometric p of the donation count,
+# mean calls received, P(linked to a blood bridge)
+ROLE_PROFILES = {
+    'Guest':           {'donated': 0.03, 'donation_p': 0.9, 'calls': 0.10, 'bridge': 0.0},
+    'Emergency Donor': {'donated': 0.48, 'donation_p': 0.8, 'calls': 1.65, 'bridge': 0.0},
+    'Bridge Donor':    {'donated': 0.22, 'donation_p': 0.45, 'calls': 1.13, 'bridge': 0.30},
+    'Patient':         {'donated': 0.01, 'donation_p': 1.0, 'calls': 0.0, 'bridge': 0.95},
+    'Volunteer':       {'donated': 0.63, 'donation_p': 0.85, 'calls': 0.43, 'bridge': 0.95}
+}
+# None = missing
+BLOOD_GROUP_WEIGHTS = {
+    'O Positive': 0.279, None: 0.267, 'B Positive': 0.211, 'A Positive': 0.125,
+    'AB Positive': 0.050, 'Do not Know': 0.023, 'O Negative': 0.017,
+    'B Negative': 0.013, 'A Negative': 0.008, 'AB Negative': 0.007
+}
+GENDER_WEIGHTS = {None: 0.591, 'Male': 0.348, 'Female': 0.055, 'Prefer not to say': 0.006}
+BRIDGE_GENDERS = ['Male', 'Female']
+INACTIVE_RATE = 0.097
+INACTIVE_COMMENTS = ['Very limited activity despite multiple calls', 'Not donated in last 1 year']
+NOT_ELIGIBLE_RATE = 0.04
+CONTACTED_RATE = 0.27
+# Patients of a bridge share one bridge_id: about this many donors per bridge
+DONORS_PER_BRIDGE = 8
+MAX_DONATIONS = 12
+DONATION_INTERVAL_DAYS = 90
+TRANSFUSION_INTERVAL_DAYS = 21
+MAX_HISTORY_DAYS = 5 * 365
+
+_HEX_PAIRS = np.array([f'{i:02x}'.encode() for i in range(256)], dtype='S2')
+
+# Same columns, in the same order, as hackathon_data.csv
+DONOR_SCHEMA = {
+    'user_id': {'kind': 'bytes', 'dtype': '|S66'},
+    'bridge_id': {'kind': 'bytes', 'dtype': '|S66'},
+    'role': {'kind': 'category', 'categories': list(ROLE_WEIGHTS)},
+    'role_status': {'kind': 'numeric', 'dtype': '|b1'},
+    'bridge_status': {'kind': 'numeric', 'dtype': '|b1'},
+    'blood_group': {'kind': 'category', 'categories': [g for g in BLOOD_GROUP_WEIGHTS if g]},
+    'gender': {'kind': 'category', 'categories': [g for g in GENDER_WEIGHTS if g]},
+    'latitude': {'kind': 'numeric', 'dtype': '<f8'},
+    'longitude': {'kind': 'numeric', 'dtype': '<f8'},
+    'bridge_gender': {'kind': 'category', 'categories': BRIDGE_GENDERS},
+    'bridge_blood_group': {'kind': 'category', 'categories': [g for g in BLOOD_GROUP_WEIGHTS if g]},
+    'quantity_required': {'kind': 'numeric', 'dtype': '<f8'},
+    'last_transfusion_date': {'kind': 'datetime'},
+    'expected_next_transfusion_date': {'kind': 'datetime'},
+    'registration_date': {'kind': 'datetime'},
+    'donor_type': {'kind': 'category', 'categories': ['Other', 'One-Time Donor', 'Regular Donor']},
+    'last_contacted_date': {'kind': 'datetime'},
+    'last_donation_date': {'kind': 'datetime'},
+    'next_eligible_date': {'kind': 'datetime'},
+    'donations_till_date': {'kind': 'numeric', 'dtype': '<f8'},
+    'eligibility_status': {'kind': 'category', 'categories': ['eligible', 'not eligible']},
+    'cycle_of_donations': {'kind': 'numeric', 'dtype': '<i8'},
+    'total_calls': {'kind': 'numeric', 'dtype': '<i8'},
+    'frequency_in_days': {'kind': 'numeric', 'dtype': '<i8'},
+    'status_of_bridge': {'kind': 'numeric', 'dtype': '|b1'},
+    'status': {'kind': 'category', 'categories': ['active']},
+    'donated_earlier': {'kind': 'category', 'categories': [True]},
+    'last_bridge_donation_date': {'kind': 'datetime'},
+    'calls_to_donations_ratio': {'kind': 'numeric', 'dtype': '<f8'},
+    'user_donation_active_status': {'kind': 'category', 'categories': ['Active', 'Inactive']},
+    'inactive_trigger_comment': {'kind': 'category', 'categories': INACTIVE_COMMENTS}
+}
+
+
+def _choice(rng, weights, n):
+    """n draws from {value: weight} (weights need not sum to 1), as an object array"""
+    values = np.empty(len(weights), dtype=object)
+    values[:] = list(weights)
+    p = np.array(list(weights.values()), dtype=float)
+    return values[rng.choice(len(values), size=n, p=p / p.sum())]
+
+
+def _hex_ids(rng, n):
+    """n random '\\x' + 64 hex ids (the hackathon_data.csv user_id format) as S66 bytes"""
+    raw = np.frombuffer(rng.bytes(32 * n), dtype=np.uint8).reshape(n, 32)
+    hex_digits = np.ascontiguousarray(_HEX_PAIRS[raw]).view('S64').ravel()
+    return np.char.add(b'\\x', hex_digits)
+
+
+def _days_ago(now, days):
+    """datetime64[ns] of `now` minus float day counts (NaN -> NaT)"""
+    offsets = np.where(np.isnan(days), np.nan, days * 86400e9)
+    result = np.full(len(days), np.datetime64('NaT'), dtype='datetime64[ns]')
+    valid = ~np.isnan(offsets)
+    result[valid] = np.datetime64(now, 'ns') - offsets[valid].astype('timedelta64[ns]')
+    return result
+
+
+def generate_locations(rng, n):
+    """(latitude, longitude) arrays clustered around the PINCODE_COORDINATES cities"""
+    centres = np.array([PINCODE_COORDINATES[pincode] for pincode in CITY_WEIGHTS])
+    weights = np.array(list(CITY_WEIGHTS.values()))
+    city = rng.choice(len(centres), size=n, p=weights / weights.sum())
+    sigma = np.where(rng.random(n) < CITY_CORE_SHARE, CITY_CORE_SIGMA_DEG, CITY_METRO_SIGMA_DEG)
+    lat = centres[city, 0] + rng.normal(0, 1, n) * sigma
+    lon = centres[city, 1] + rng.normal(0, 1, n) * sigma
+    missing = rng.random(n) < MISSING_LOCATION_RATE
+    lat[missing] = np.nan
+    lon[missing] = np.nan
+    return lat, lon
+
+
+def generate_donors(rng, n, now=None):
+    """One chunk of n synthetic donors: {column: array} following DONOR_SCHEMA"""
+    now = now or datetime.now()
+    roles = list(ROLE_WEIGHTS)
+    role_p = np.array(list(ROLE_WEIGHTS.values()))
+    role_index = rng.choice(len(roles), size=n, p=role_p / role_p.sum())
+    role = np.array(roles, dtype=object)[role_index]
+    profile = {key: np.array([ROLE_PROFILES[r][key] for r in roles])
+               for key in ('donated', 'donation_p', 'calls', 'bridge')}
+    latitude, longitude = generate_locations(rng, n)
+
+    # Registration skews recent: the platform keeps growing
+    registration_age = np.minimum(rng.exponential(300, n), MAX_HISTORY_DAYS)
+
+    # Donation history
+    donated = rng.random(n) < profile['donated'][role_index]
+    donations = np.where(donated, np.minimum(rng.geometric(profile['donation_p'][role_index]), MAX_DONATIONS), np.nan)
+    last_donation_age = np.where(donated, np.minimum(rng.exponential(450, n), MAX_HISTORY_DAYS), np.nan)
+    last_donation = _days_ago(now, last_donation_age)
+    next_eligible = _days_ago(now, last_donation_age - DONATION_INTERVAL_DAYS)
+    total_calls = rng.poisson(profile['calls'][role_index])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        calls_ratio = np.where(donated, total_calls / donations, np.nan)
+    not_eligible = (next_eligible > np.datetime64(now, 'ns')) | (rng.random(n) < NOT_ELIGIBLE_RATE)
+
+    # Blood bridges (recurring transfusions for a patient)
+    bridged = rng.random(n) < profile['bridge'][role_index]
+    bridge_pool = _hex_ids(rng, max(1, n // DONORS_PER_BRIDGE))
+    bridge_id = np.where(bridged, bridge_pool[rng.integers(0, len(bridge_pool), n)], b'')
+    transfusion_age = np.where(bridged, rng.uniform(0, 70, n), np.nan)
+    last_transfusion = _days_ago(now, transfusion_age)
+    quantity = np.where(bridged, rng.choice([1.0, 2.0, 3.0], size=n, p=[0.6, 0.37, 0.03]), np.nan)
+
+    inactive = rng.random(n) < INACTIVE_RATE
+    contacted_age = np.where(rng.random(n) < CONTACTED_RATE, rng.exponential(150, n), np.nan)
+
+    return {
+        'user_id': _hex_ids(rng, n),
+        'bridge_id': bridge_id,
+        'role': role,
+        'role_status': np.ones(n, dtype=bool),
+        'bridge_status': bridged,
+        'blood_group': _choice(rng, BLOOD_GROUP_WEIGHTS, n),
+        'gender': _choice(rng, GENDER_WEIGHTS, n),
+        'latitude': latitude,
+        'longitude': longitude,
+        'bridge_gender': np.where(bridged, _choice(rng, dict.fromkeys(BRIDGE_GENDERS, 1), n), None),
+        'bridge_blood_group': np.where(bridged, _choice(rng, BLOOD_GROUP_WEIGHTS, n), None),
+        'quantity_required': quantity,
+        'last_transfusion_date': last_transfusion,
+        'expected_next_transfusion_date': _days_ago(now, transfusion_age - TRANSFUSION_INTERVAL_DAYS),
+        'registration_date': _days_ago(now, registration_age),
+        'donor_type': np.array([DONOR_TYPE_BY_ROLE.get(r, 'Other') for r in roles], dtype=object)[role_index],
+        'last_contacted_date': _days_ago(now, contacted_age),
+        'last_donation_date': last_donation,
+        'next_eligible_date': next_eligible,
+        'donations_till_date': donations,
+        'eligibility_status': np.where(not_eligible, 'not eligible', 'eligible'),
+        'cycle_of_donations': np.where(donated, rng.integers(0, 120, n), 0),
+        'total_calls': total_calls,
+        'frequency_in_days': np.where(bridged, rng.integers(7, 59, n), 0),
+        'status_of_bridge': bridged,
+        'status': np.full(n, 'active', dtype=object),
+        'donated_earlier': np.where(donated, True, None),
+        'last_bridge_donation_date': last_transfusion,
+        'calls_to_donations_ratio': calls_ratio,
+        'user_donation_active_status': np.where(inactive, 'Inactive', 'Active'),
+        'inactive_trigger_comment': np.where(inactive, _choice(rng, dict.fromkeys(INACTIVE_COMMENTS, 1), n), None)
+    }
+
+
+def generate_donor_store(n_donors, store_dir=STORE_DIR, seed=DEFAULT_SEED,
+                         chunk_rows=SYNTHETIC_CHUNK_ROWS, now=None):
+    """
+    Write n_donors synthetic donors as the 'donors' table of store_dir
+    (load_donors / DonorTable.from_store read it like a compiled CSV).
+    The table is fully determined by (seed, chunk_rows, now).
+    Returns the table manifest.
+    """
+    now = now or datetime.now()
+    rng = np.random.default_rng(seed)
+    metadata = {'source': None, 'generator': 'synthetic_data', 'seed': seed,
+                'chunk_rows': chunk_rows, 'generated_for': now.isoformat(timespec='seconds')}
+    with TableWriter(os.path.join(store_dir, 'donors'), n_donors, DONOR_SCHEMA, **metadata) as writer:
+        for start in range(0, n_donors, chunk_rows):
+            writer.write(generate_donors(rng, min(chunk_rows, n_donors - start), now))
+    return writer.manifest
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Blood Bridge synthetic data generator")
+    parser.add_argument('--donors', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=3 * 365, help="days of demand history")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED)
+    parser.add_argument('--chunk-rows', type=int, default=SYNTHETIC_CHUNK_ROWS)
+    parser.add_argument('--store-dir', required=True, help="donor store to write (not the production one)")
+    parser.add_argument('--demand-csv', help="demand history output (default: <store-dir>/historical_blood_demand.csv)")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    print(f"🔄 Generating {args.donors:,} donors (seed {args.seed})...")
+    manifest = generate_donor_store(args.donors, args.store_dir, args.seed, args.chunk_rows)
+    print(f"✅ {manifest['n_rows']:,} donors written to {os.path.join(args.store_dir, 'donors')} "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    demand_csv = args.demand_csv or os.path.join(args.store_dir, 'historical_blood_demand.csv')
+    history = generate_demand_history(args.days, rng=np.random.default_rng(args.seed))
+    history.to_csv(demand_csv, index=False)
+    print(f"✅ {args.days:,} days of demand ({len(history):,} rows) written to {demand_csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())